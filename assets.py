@@ -0,0 +1,78 @@
+"""
+Pre-resized image assets for the GUI.
+
+Decoding the full-size dice and background images and resizing them with PIL used to dominate startup. Every
+(source image, size) pair is now resized once and stored as a PNG next to the disk cache (see diskcache.py), named
+after a hash of the source file and the size, so later launches hand the small PNG straight to Tk without touching
+PIL. Editing a source image changes its hash, so a stale entry is never used.
+"""
+
+import hashlib
+import os
+import tkinter as tk
+
+from diskcache import disk_cache
+
+# PhotoImages already created in this process, by (source path, size)
+images = {}
+source_hashes = {}
+
+
+def source_hash(path):
+
+    if path not in source_hashes:
+        with open(path, 'rb') as file:
+            source_hashes[path] = hashlib.sha1(file.read()).hexdigest()[:16]
+
+    return source_hashes[path]
+
+def cached_path(path, size = None):
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    dims = '' if size is None else '-%dx%d' % tuple(size)
+
+    return os.path.join(disk_cache.directory, 'Image-' + stem + '-' + source_hash(path) + dims + '.png')
+
+def resized(path, size = None):
+
+    # PIL is only needed when an entry is missing from the cache
+    from PIL import Image
+
+    image = Image.open(path)
+
+    return image if size is None else image.resize(size)
+
+def photo_image(path, size = None, keep = True):
+    """
+    Tk PhotoImage of the image at path, resized to size = (width, height) if given.
+    Falls back to resizing in memory when the disk cache is disabled or cannot be written.
+    keep = False leaves the PhotoImage out of the in-process memo (e.g. backgrounds at passing window sizes).
+    """
+
+    key = (path, None if size is None else tuple(size))
+
+    if key in images:
+        return images[key]
+
+    photo = load_photo(path, size)
+
+    if keep:
+        images[key] = photo
+
+    return photo
+
+def load_photo(path, size):
+
+    if disk_cache.enabled:
+        target = cached_path(path, size)
+
+        if not os.path.exists(target):
+            image = resized(path, size)
+            disk_cache.write(target, lambda file: image.save(file, 'PNG'))
+
+        if os.path.exists(target):
+            return tk.PhotoImage(file = target)
+
+    from PIL import ImageTk
+
+    return ImageTk.PhotoImage(resized(path, size))
@@ -0,0 +1,187 @@
+"""
+Computes the distributions of many attack / defense pools from the command line, without a display.
+
+Every input line is a pool spec such as '2 red 1 blue vs 1 black 1 grey' (either side may be left out, and blank
+lines or lines starting with '#' are skipped). Specs are read as they arrive and computed on a process pool, with a
+bounded number of jobs in flight, and the results are streamed in input order, either as CSV rows (spec, chart,
+value, probability) or as one JSON object per line.
+
+Usage: python batch.py [FILE] [--format csv|json] [--measure exact|great|less] [--engine exact|numpy] [--workers N]
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from dicepool import ENGINES, AttackPool, DefensePool, net_damage
+
+ATTACK_COLOURS = {colour.lower(): colour for colour in AttackPool().atk_colours}
+DEFENSE_COLOURS = {colour.lower(): colour for colour in DefensePool().def_colours}
+
+# Jobs queued per worker process; input is only read this far ahead of the output
+JOBS_PER_WORKER = 4
+
+
+def parse_side(tokens, colours):
+
+    # 'count colour' pairs, e.g. ['2', 'red', '1', 'blue'] -> {'Red': 2, 'Blue': 1}
+    if len(tokens) % 2:
+        raise ValueError('Expected "count colour" pairs, got: ' + ' '.join(tokens))
+
+    state = {}
+
+    for count, colour in zip(tokens[::2], tokens[1::2]):
+
+        if colour.lower() not in colours:
+            raise ValueError('Unknown die colour: ' + colour)
+        if not count.isdigit():
+            raise ValueError('Invalid number of dice: ' + count)
+
+        state[colours[colour.lower()]] = state.get(colours[colour.lower()], 0) + int(count)
+
+    return state
+
+def parse_spec(spec):
+    """
+    Returns the (attack, defense) dice counts of a spec such as '2 red 1 blue vs 1 black 1 grey'.
+    A spec without 'vs' is an attack pool; one starting with 'vs' is a defense pool.
+    """
+
+    tokens = spec.split()
+
+    if tokens.count('vs') > 1:
+        raise ValueError('More than one "vs" in: ' + spec)
+
+    if 'vs' in tokens:
+        split = tokens.index('vs')
+        atk_state, def_state = parse_side(tokens[:split], ATTACK_COLOURS), parse_side(tokens[split + 1:], DEFENSE_COLOURS)
+    else:
+        atk_state, def_state = parse_side(tokens, ATTACK_COLOURS), {}
+
+    if not sum(atk_state.values()) and not sum(def_state.values()):
+        raise ValueError('Empty pool spec: ' + spec)
+
+    return atk_state, def_state
+
+def compute(atk_state, def_state, measure, engine):
+
+    # Chart data of one spec as plain floats: {'Miss': p, 'Heart': [...], ..., 'Shield': [...], 'Damage': [...]}
+    atk_pool = AttackPool(engine)
+    def_pool = DefensePool(engine)
+    atk_pool.atk_state.update(atk_state)
+    def_pool.def_state.update(def_state)
+
+    result = {}
+
+    if sum(atk_state.values()):
+        curves = atk_pool.curves()
+        result['Miss'] = float(curves['Miss'])
+
+        for kind in atk_pool.event_keys:
+            result[kind] = [float(prob) for prob in curves[kind][measure]]
+
+    if sum(def_state.values()):
+        result['Shield'] = [float(prob) for prob in def_pool.curves()['Shield'][measure]]
+
+    if sum(atk_state.values()):
+        result['Damage'] = [float(prob) for prob in net_damage(atk_pool, def_pool)['Damage'][measure]]
+
+    return result
+
+def read_specs(file):
+
+    for number, line in enumerate(file, 1):
+
+        spec = line.split('#')[0].strip()
+
+        if spec:
+            yield number, spec
+
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Stream Diiscent distributions for many pool specs.')
+    parser.add_argument('file', nargs = '?', default = '-', help = 'File with one pool spec per line (default: stdin)')
+    parser.add_argument('--format', choices = ('csv', 'json'), default = 'csv', help = 'Output format')
+    parser.add_argument('--measure', choices = ('exact', 'great', 'less'), default = 'exact', help = 'P(X = x), P(X >= x) or P(X <= x)')
+    parser.add_argument('--engine', choices = ENGINES, default = 'exact', help = 'Probability engine')
+    parser.add_argument('--workers', type = int, default = None, help = 'Number of worker processes')
+    args = parser.parse_args()
+
+    file = sys.stdin if args.file == '-' else open(args.file)
+    writer = csv.writer(sys.stdout, lineterminator = '\n')
+    errors = 0
+
+    if args.format == 'csv':
+        writer.writerow(['spec', 'chart', 'value', 'probability'])
+        sys.stdout.flush()
+
+    def write(spec, result):
+
+        if args.format == 'json':
+            sys.stdout.write(json.dumps(dict(spec = spec, **result)) + '\n')
+        else:
+            for chart, probs in result.items():
+                if chart == 'Miss':
+                    writer.writerow([spec, chart, '', probs])
+                else:
+                    writer.writerows([spec, chart, value, prob] for value, prob in enumerate(probs))
+
+        sys.stdout.flush()
+
+    def write_results():
+
+        # Results leave in input order, each as soon as it and every earlier spec are done. After a failure the
+        # queue is still drained, so the reading loop never blocks, and the error is raised on the main thread
+        while True:
+            job = pending.get()
+            if job is None:
+                return
+            if failures:
+                job[1].cancel()
+                continue
+
+            spec, future = job
+            try:
+                write(spec, future.result())
+            except BaseException as error:
+                failures.append(error)
+
+    # (spec, future) pairs in input order. The queue is bounded, so at most JOBS_PER_WORKER jobs per worker are queued
+    pending = queue.Queue(maxsize = JOBS_PER_WORKER*(args.workers or os.cpu_count() or 1))
+    writer_thread = threading.Thread(target = write_results, daemon = True)
+    failures = []
+
+    with file, ProcessPoolExecutor(max_workers = args.workers) as executor:
+
+        writer_thread.start()
+
+        try:
+            # Specs are read as they arrive, so piped input streams out while later lines are still being written
+            for number, spec in read_specs(file):
+
+                try:
+                    atk_state, def_state = parse_spec(spec)
+                except ValueError as error:
+                    print('Line ' + str(number) + ': ' + str(error), file = sys.stderr)
+                    errors += 1
+                    continue
+
+                pending.put((spec, executor.submit(compute, atk_state, def_state, args.measure, args.engine)))
+
+        finally:
+            pending.put(None)
+            writer_thread.join()
+
+        if failures:
+            raise failures[0]
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
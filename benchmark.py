@@ -0,0 +1,233 @@
+"""
+Benchmarks for the dicepool engine and the chart paths, written to a JSON file so runs can be compared between commits.
+
+For every engine, every mix of colours (dice spread evenly over the colours in the mix) and every pool size from 1 to
+beyond the pool cap, it times:
+- bundle_combine: Folding the last die into the bundles of the rest of the pool (the legacy bundle path).
+- roll: The full distribution, cold (no LRU entry, disk cache or lookup table).
+- event_select: One threshold query on a cached roll.
+- chart_data: Everything one chart needs (curves(), plus net damage against one black die for attack pools), cold.
+- render: Drawing a draw_atk_probs / draw_def_probs equivalent figure with the headless Agg backend (once per pool).
+
+Usage: python benchmark.py [--output benchmark.json] [--compare OLD.json] [--cap 7] [--beyond 2] [--repeats 3]
+                           [--engine exact|numpy] [--kind Attack|Defense]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from itertools import combinations
+
+import numpy as np
+
+from dicepool import ENGINES, AttackPool, DefensePool, distribution_cache, net_damage
+from diskcache import disk_cache
+
+POOL_CAP = 7
+
+# A benchmark is reported as a regression when its median is this much slower than in the compared run,
+# and by more than NOISE_FLOOR seconds (timer noise dominates the smallest benchmarks)
+REGRESSION_RATIO = 1.2
+NOISE_FLOOR = 0.0002
+
+
+def colour_mixes(colours):
+
+    for size in range(1, len(colours) + 1):
+        for mix in combinations(colours, size):
+            yield mix
+
+def spread(mix, num_dice):
+
+    # num_dice dice spread as evenly as possible over the colours of the mix, earlier colours taking the remainder
+    return {colour: num_dice//len(mix) + (ind < num_dice % len(mix)) for ind, colour in enumerate(mix)}
+
+def make_pool(kind, engine, state):
+
+    pool = AttackPool(engine) if kind == 'Attack' else DefensePool(engine)
+    pool.state.update(state)
+
+    return pool
+
+def cold():
+
+    # Forget every computed distribution, so the next call does all of the work again
+    distribution_cache.clear()
+
+def measure(function, setup = None, repeats = 3):
+
+    times = []
+
+    for repeat in range(repeats):
+
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return {'best': min(times), 'median': statistics.median(times), 'repeats': repeats}
+
+def last_die_split(kind, pool, state):
+
+    # (bundles of the pool without its last die, faces of that die)
+    colour = [colour for colour in state if state[colour]][-1]
+    rest = dict(state, **{colour: state[colour] - 1})
+
+    if sum(rest.values()):
+        bundles = make_pool(kind, pool.engine, rest).roll()
+    else:
+        bundles = [dict({key: 0 for key in pool.event_keys}, Prob = 1)]
+
+    return bundles, pool.dice[colour]
+
+def chart_data(kind, pool, defense):
+
+    if kind == 'Attack':
+        pool.curves()
+        net_damage(pool, defense)
+    else:
+        pool.curves()
+
+def render(kind, pool):
+
+    # Same figure as MainPage.draw_atk_probs / draw_def_probs, drawn off-screen
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    curves = pool.curves()
+    symbol = 'Heart' if kind == 'Attack' else 'Shield'
+    probs = ([curves['Miss']*100] if kind == 'Attack' and pool.atk_state['Blue'] else []) + [prob*100 for prob in curves[symbol]['great']]
+    x_axis = list(range(len(probs)))
+
+    figure = Figure(figsize = (5, 3), dpi = 100)
+    graph = figure.add_subplot(1, 1, 1)
+    bars = graph.bar(x = x_axis, height = probs)
+
+    for rect, prob in zip(bars, probs):
+        graph.text(rect.get_x() + rect.get_width()/2, rect.get_height(), str(pool.fraction_rounder(prob)), ha = 'center', va = 'bottom', size = 8)
+
+    graph.set_xlabel(symbol + ' (x)')
+    graph.set_ylabel('Probability (%)')
+    graph.set_xticks(x_axis)
+    graph.set_title('Probability of Rolling at least x ' + symbol, y = 1.08, size = 12)
+    graph.set_ylim(0, 100)
+
+    FigureCanvasAgg(figure).draw()
+
+def run_pool(kind, engine, mix, state, repeats, with_render):
+
+    pool = make_pool(kind, engine, state)
+    defense = make_pool('Defense', engine, {'Black': 1})
+    base = {'kind': kind, 'engine': engine, 'mix': list(mix), 'dice': sum(state.values()), 'state': state}
+    results = []
+
+    rest, die = last_die_split(kind, pool, state)
+    results.append(dict(base, benchmark = 'bundle_combine', **measure(lambda: pool.bundle_combine(rest, die), repeats = repeats)))
+
+    results.append(dict(base, benchmark = 'roll', **measure(pool.roll, cold, repeats)))
+
+    pool.roll()
+    query = (lambda: pool.event_select(2, 0, 0)) if kind == 'Attack' else (lambda: pool.event_select(2))
+    results.append(dict(base, benchmark = 'event_select', **measure(query, repeats = repeats)))
+
+    results.append(dict(base, benchmark = 'chart_data', **measure(lambda: chart_data(kind, pool, defense), cold, repeats)))
+
+    if with_render:
+        pool.curves()
+        results.append(dict(base, benchmark = 'render', engine = None, **measure(lambda: render(kind, pool), repeats = repeats)))
+
+    return results
+
+def result_key(result):
+
+    return (result['benchmark'], result['kind'], result['engine'], tuple(sorted(result['state'].items())))
+
+def compare(results, path):
+
+    # Prints every benchmark whose median got slower than REGRESSION_RATIO times the old median
+    with open(path) as file:
+        old = {result_key(result): result for result in json.load(file)['results']}
+
+    regressions = 0
+
+    for result in results:
+
+        previous = old.get(result_key(result))
+
+        if previous is not None and result['median'] > max(REGRESSION_RATIO*previous['median'], previous['median'] + NOISE_FLOOR):
+            regressions += 1
+            print('Slower: %s %s %s %s %.3f ms -> %.3f ms' % (result['benchmark'], result['kind'], result['engine'], result['state'], 1000*previous['median'], 1000*result['median']))
+
+    print(str(regressions) + ' regressions against ' + path)
+
+    return regressions
+
+def git_commit():
+
+    # Commit of the checkout holding this script, wherever it is run from
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = os.path.dirname(os.path.abspath(__file__)), capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Benchmark the Diiscent engine and chart paths.')
+    parser.add_argument('--output', default = 'benchmark.json', help = 'Results file (JSON)')
+    parser.add_argument('--compare', default = None, help = 'Earlier results file to report regressions against')
+    parser.add_argument('--cap', type = int, default = POOL_CAP, help = 'Pool cap')
+    parser.add_argument('--beyond', type = int, default = 2, help = 'How many dice past the cap to measure')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'Timed runs per benchmark')
+    parser.add_argument('--engine', choices = ENGINES, action = 'append', help = 'Engine(s) to measure (default: all)')
+    parser.add_argument('--kind', choices = ('Attack', 'Defense'), action = 'append', help = 'Pool kind(s) to measure (default: both)')
+    args = parser.parse_args()
+
+    # Cold timings must not be served from disk or from prebuilt tables
+    disk_cache.enabled = False
+
+    results = []
+    start = time.perf_counter()
+
+    for kind in args.kind or ('Attack', 'Defense'):
+
+        colours = make_pool(kind, 'exact', {}).colours
+
+        for mix in colour_mixes(colours):
+            for num_dice in range(len(mix), args.cap + args.beyond + 1):
+                for ind, engine in enumerate(args.engine or ENGINES):
+
+                    state = spread(mix, num_dice)
+                    results.extend(run_pool(kind, engine, mix, state, args.repeats, ind == 0))
+
+            print(kind + ' ' + '+'.join(mix) + ' done', file = sys.stderr)
+
+    meta = {'commit': git_commit(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cap': args.cap,
+            'repeats': args.repeats,
+            'seconds': time.perf_counter() - start
+            }
+
+    with open(args.output, 'w') as file:
+        json.dump({'meta': meta, 'results': results}, file, indent = 1)
+
+    print(str(len(results)) + ' results -> ' + args.output, file = sys.stderr)
+
+    if args.compare is not None:
+        return 1 if compare(results, args.compare) else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Builds the lookup tables holding every attack and defense pool composition up to the pool cap.
+
+Each pool is computed bottom-up as a smaller pool plus one die, one pool size at a time, with the
+convolutions of each size spread across a process pool. The tables are written next to the disk cache
+(see diskcache.py) and are picked up automatically by AttackPool, DefensePool and any other DicePool.
+
+Usage: python build_tables.py [--cap 7] [--workers N] [--directory DIR]
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations_with_replacement
+import numpy as np
+
+from dicepool import DicePool, load_dice, tensor_convolve
+from diskcache import atomic_write, disk_cache
+from lookup import table_paths
+
+POOL_CAP = 7
+
+# Largest denominator the int64 tables can hold
+MAX_DENOMINATOR = 2**62
+
+
+def compositions(num_colours, size):
+
+    # Every tuple of dice counts (one entry per colour) with the given total
+    for dice in combinations_with_replacement(range(num_colours), size):
+        yield tuple(dice.count(colour) for colour in range(num_colours))
+
+def build_table(pool, colours, cap, executor):
+
+    die_grids = {colour: pool.die_count_tensor(colour) for colour in colours}
+    ndim = die_grids[colours[0]][0].ndim
+
+    # Count grids by dice counts, starting from the empty pool
+    grids = {(0,)*len(colours): (np.ones((1,)*ndim, dtype = np.int64), 1)}
+
+    for size in range(1, cap + 1):
+
+        children = []
+
+        for counts in compositions(len(colours), size):
+
+            # Parent pool: the same dice minus one die of the first colour present
+            first = next(ind for ind, num_dice in enumerate(counts) if num_dice)
+            parent = counts[:first] + (counts[first] - 1,) + counts[first + 1:]
+            children.append((counts, parent, colours[first]))
+
+        parent_grids = [grids[parent][0] for counts, parent, colour in children]
+        added_dice = [die_grids[colour][0] for counts, parent, colour in children]
+
+        for (counts, parent, colour), grid in zip(children, executor.map(tensor_convolve, parent_grids, added_dice, chunksize = 8)):
+
+            denominator = grids[parent][1]*die_grids[colour][1]
+
+            if denominator > MAX_DENOMINATOR:
+                raise ValueError('Pool cap ' + str(cap) + ' is too large for int64 lookup tables')
+
+            grids[counts] = (grid, denominator)
+
+    del grids[(0,)*len(colours)]
+
+    return grids
+
+def write_table(kind, digest, grids, directory):
+
+    data = []
+    index = []
+    offset = 0
+
+    for counts in sorted(grids):
+        grid, denominator = grids[counts]
+        data.append(grid.ravel())
+        index.append(list(counts) + [offset, denominator] + list(grid.shape))
+        offset += grid.size
+
+    data_path, index_path = table_paths(kind, digest, directory)
+
+    # Written through uniquely named temporary files, so readers and concurrent builds never see a half-written table
+    atomic_write(data_path, lambda file: np.save(file, np.concatenate(data).astype(np.int64)))
+    atomic_write(index_path, lambda file: np.save(file, np.array(index, dtype = np.int64)))
+
+    return data_path, offset
+
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Build Diiscent lookup tables for every pool composition.')
+    parser.add_argument('--cap', type = int, default = POOL_CAP, help = 'Largest number of dice in a pool')
+    parser.add_argument('--workers', type = int, default = None, help = 'Number of worker processes')
+    parser.add_argument('--directory', default = disk_cache.directory, help = 'Output directory (pools read tables from the disk cache directory)')
+    args = parser.parse_args()
+
+    # One table per kind of dice in the definition file, custom kinds included
+    pools = [DicePool(kind) for kind in load_dice()]
+
+    with ProcessPoolExecutor(max_workers = args.workers) as executor:
+
+        for pool in pools:
+
+            start = time.perf_counter()
+            grids = build_table(pool, pool.colours, args.cap, executor)
+            path, cells = write_table(pool.kind, pool.definition_hash(), grids, args.directory)
+
+            print(pool.kind + ': ' + str(len(grids)) + ' pools, ' + str(cells) + ' cells, ' + str(round(time.perf_counter() - start, 2)) + 's -> ' + path)
+
+
+if __name__ == '__main__':
+    main()
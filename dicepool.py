@@ -1,485 +1,829 @@
+from collections import OrderedDict
 from fractions import Fraction
-import matplotlib as mpl
-import matplotlib.pyplot as plt
+from math import lcm
+import hashlib
+import json
+import os
+import threading
+from operator import add, eq, ge, le
+import numpy as np
+from diskcache import disk_cache
+from lookup import load_table
 
-mpl.style.use('ggplot')
-
-class AttackPool:
+class DistributionCache:
     
-    def __init__(self):
+    def __init__(self, maxsize = 256):
         """
-        Terminology:
-        - Event: Given a collection of dice, an event describes a possible roll outcome in terms of number of hearts, range and surges.
-        - Bundle: A bundle is an event, taken together with its associated probability.
+        Bounded least-recently-used store of roll() results, shared by every pool in the process.
+        - Keys: The canonical dice counts of a pool, e.g. ('Attack', ('Red', 2), ('Blue', 1)).
+        - Values: The bundles produced by roll() for that composition.
         """
         
-        self.event_keys = ['Heart', 'Range', 'Surge']
-        self.atk_colours = ['Red','Yellow','Blue','Green']
-        self.atk_state = {'Red': 0,
-                      'Yellow': 0,
-                      'Blue': 0,
-                      'Green':0
-                      }
-        
-        self.heart_max ={'Red': 3,
-                         'Blue': 2,
-                         'Yellow': 2,
-                         'Green':1
-                         }
-        
-        self.range_max ={'Red': 0,
-                         'Blue': 6,
-                         'Yellow': 2,
-                         'Green': 1
-                         }
-        self.heart_min = {'Red': 1,
-                         'Blue': 1,
-                         'Yellow': 0,
-                         'Green':0
-                         }
-        self.range_min = {'Red': 0,
-                          'Blue': 2,
-                          'Yellow': 0,
-                          'Green': 0            
-                          }
-                
-        self.red_die = [{'Heart': 1, 'Range': 0, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 2, 'Range': 0, 'Surge': 0, 'Prob': Fraction(1,2)},
-                     {'Heart': 3, 'Range': 0, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 3, 'Range': 0, 'Surge': 1, 'Prob': Fraction(1,6)}
-                     ]
-        
-        self.blue_die = [{'Heart': 'Miss', 'Range': 'Miss', 'Surge': 'Miss', 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 5, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 6, 'Surge': 1, 'Prob': Fraction(1,6)},
-                     {'Heart': 2, 'Range': 2, 'Surge': 1, 'Prob': Fraction(1,6)},
-                     {'Heart': 2, 'Range': 3, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 2, 'Range': 4, 'Surge': 0, 'Prob': Fraction(1,6)}
-                    ]
-        
-        self.yellow_die = [{'Heart': 0, 'Range': 1, 'Surge': 1, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 1, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 2, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 0, 'Surge': 1, 'Prob': Fraction(1,6)},
-                     {'Heart': 2, 'Range': 0, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 2, 'Range': 0, 'Surge': 1, 'Prob': Fraction(1,6)}
-                    ]
-        
-        self.green_die = [{'Heart': 0, 'Range': 0, 'Surge': 1, 'Prob': Fraction(1,6)},
-                     {'Heart': 0, 'Range': 1, 'Surge': 1, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 0, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 1, 'Surge': 0, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 0, 'Surge': 1, 'Prob': Fraction(1,6)},
-                     {'Heart': 1, 'Range': 1, 'Surge': 1, 'Prob': Fraction(1,6)}
-                    ]
-        
-        self.dice = {'Red': self.red_die, 
-                     'Yellow': self.yellow_die,
-                     'Blue': self.blue_die,
-                     'Green': self.green_die
-                     }
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.store = OrderedDict()
+        self.lock = threading.Lock()
         
-    def roll(self):
+    def get(self, key):
         
-        dice = []
+        with self.lock:
+            if key in self.store:
+                self.store.move_to_end(key)
+                self.hits += 1
+                return self.store[key]
+            
+            self.misses += 1
+            return None
         
-        for colour in self.atk_colours:
-            for num_die in range(self.atk_state[colour]):
-                dice.append(self.dice[colour])
-                
-        total_bundle = dice[0]   
+    def contains(self, key):
         
-        for die in dice[1::]:
-            
-            total_bundle = self.bundle_combine(total_bundle,die)
-            
-        return total_bundle
+        # Membership test that leaves the hit/miss counters and recency order alone
+        with self.lock:
+            return key in self.store
         
-    def bundle_combine(self, bundle_A, bundle_B):
+    def put(self, key, value):
         
-        # Not strictly just single dice. Combines two object events such as 
-        # 1) Collection of two dice and 
-        # 2) a (third) independent die
-        bundles = []
-        events = []
+        with self.lock:
+            self.store[key] = value
+            self.store.move_to_end(key)
+            self.evict()
+            
+    def evict(self):
         
-        for bundle_a in bundle_A:
-                
-            for bundle_b in bundle_B:
-                
-                if bundle_a['Heart'] == 'Miss' or bundle_b['Heart'] == 'Miss':
-                    new_bundle = {'Heart': 'Miss', 'Range': 'Miss', 'Surge': 'Miss', 'Prob': bundle_a['Prob']*bundle_b['Prob']}
-                    new_event = {'Heart': 'Miss', 'Range': 'Miss', 'Surge': 'Miss'}
-                    
-                else:
-                    new_bundle = self.combine_bundles(bundle_a, bundle_b)
-                    new_event = self.grab_event(new_bundle)
-                
-                if new_event in events:
-                    bundles[self.iloc_bundle_match(bundles, new_event)]['Prob'] += new_bundle['Prob']
-                else:
-                    events.append(new_event)
-                    bundles.append(new_bundle)
-                    
-        return bundles
-                
-    def iloc_bundle_match(self, bundles, target):
-        iloc = 0
+        # Drop the least recently used entries until the cache fits its size
+        while len(self.store) > self.maxsize:
+            self.store.popitem(last = False)
+            self.evictions += 1
+            
+    def resize(self, maxsize):
         
-        for bundle in bundles:
+        with self.lock:
+            self.maxsize = maxsize
+            self.evict()
             
-            if self.grab_event(bundle) == target:
+    def clear(self):
         
-                return iloc
-            else:
-                iloc+=1
-                
+        with self.lock:
+            self.store.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            
+    def info(self):
+        
+        with self.lock:
+            return {'Hits': self.hits,
+                    'Misses': self.misses,
+                    'Evictions': self.evictions,
+                    'Size': len(self.store),
+                    'Maxsize': self.maxsize
+                    }
+
+distribution_cache = DistributionCache()
+
+ENGINES = ('exact', 'numpy')
+
+# Comparison behind each measure; anything other than 'exact' and 'great' compares as 'less'
+COMPARISONS = {'exact': eq, 'great': ge, 'less': le}
+
+def cumulate(pmf):
+    
+    # Builds every chart measure from a probability mass list in one sweep each way:
+    # 'exact' = P(X = x), 'less' = P(X <= x) and 'great' = P(X >= x)
+    less = []
+    running = 0
+    for prob in pmf:
+        running += prob
+        less.append(running)
+        
+    great = []
+    running = 0
+    for prob in reversed(pmf):
+        running += prob
+        great.append(running)
+    great.reverse()
+    
+    return {'exact': list(pmf), 'less': less, 'great': great}
+
+# Above this many non-zero cells in the sparser grid, convolutions go through the FFT
+FFT_THRESHOLD = 64
+
+def tensor_convolve(tensor_a, tensor_b):
+    
+    # Full n-dimensional convolution of two probability grids. Every non-zero cell of the sparser
+    # grid adds one shifted, scaled copy of the other grid, so the work is a handful of array operations
+    if tensor_a.ndim == 1:
+        return np.convolve(tensor_a, tensor_b)
     
-    def combine_bundles(self, bundle_1, bundle_2):
+    if np.count_nonzero(tensor_a) < np.count_nonzero(tensor_b):
+        tensor_a, tensor_b = tensor_b, tensor_a
         
-        combined_bundle = {'Heart': bundle_1['Heart'] + bundle_2['Heart'],
-                 'Range': bundle_1['Range'] + bundle_2['Range'],
-                 'Surge': bundle_1['Surge'] + bundle_2['Surge'],
-                 'Prob': bundle_1['Prob']*bundle_2['Prob']
-                 }
+    shape = tuple(len_a + len_b - 1 for len_a, len_b in zip(tensor_a.shape, tensor_b.shape))
+    
+    # Integer count grids always take the direct route so they stay exact
+    if np.count_nonzero(tensor_b) > FFT_THRESHOLD and tensor_a.dtype.kind == 'f':
+        return fft_convolve(tensor_a, tensor_b, shape)
+    
+    total = np.zeros(shape, dtype = np.result_type(tensor_a, tensor_b))
+    
+    for index in zip(*np.nonzero(tensor_b)):
+        window = tuple(slice(i, i + n) for i, n in zip(index, tensor_a.shape))
+        total[window] += tensor_b[index]*tensor_a
         
-        return combined_bundle
+    return total
+
+def fft_convolve(tensor_a, tensor_b, shape):
     
-    def event_select(self, heart_val=0, range_val = 0, surge_val = 0, heart_measure = 'great', range_measure = 'great', surge_measure = 'great'):
+    # Convolution theorem for two large grids. Rounding noise is cleared by convolving the supports
+    # of both grids as well, so impossible outcomes stay exactly zero
+    total = np.fft.irfftn(np.fft.rfftn(tensor_a, shape)*np.fft.rfftn(tensor_b, shape), shape)
+    support = np.fft.irfftn(np.fft.rfftn(tensor_a > 0, shape)*np.fft.rfftn(tensor_b > 0, shape), shape) > 0.5
+    
+    return np.where(support, np.clip(total, 0, None), 0.0)
+
+def tensor_power(tensor, n):
+    
+    # Distribution of n identical dice by repeated squaring: log2(n) squarings instead of n - 1 single-die steps
+    total = None
+    
+    while n:
+        if n & 1:
+            total = tensor if total is None else tensor_convolve(total, tensor)
+        n >>= 1
+        if n:
+            tensor = tensor_convolve(tensor, tensor)
+            
+    return total
+
+def count_divide(counts, die):
+    
+    # Exact deconvolution: returns the counts that give 'counts' when combined with 'die' (both keyed by event tuples,
+    # with misses left out). Terms are peeled off in lexicographic order against the die's lowest face, one die's
+    # worth of work per outcome, and every division is exact because all counts are integers
+    lead = min(die)
+    remainder = dict(counts)
+    quotient = {}
+    
+    for key in sorted(counts):
         
-        events = []
+        count = remainder[key]
+        if count == 0:
+            continue
         
-        if heart_val == 'Miss':
-            
-            for event in self.roll():
-                if event['Heart'] == 'Miss':
-                    events.append(event)
-        else:      
+        base = tuple(k - l for k, l in zip(key, lead))
+        multiple = count//die[lead]
+        quotient[base] = multiple
+        
+        for face, face_count in die.items():
+            remainder[tuple(b + f for b, f in zip(base, face))] -= multiple*face_count
             
-            for event in self.roll():
-                
-                if event['Heart'] != 'Miss': 
-                    
-                    if self.event_comparison(event['Heart'], heart_val, heart_measure) and self.event_comparison(event['Range'], range_val, range_measure) and self.event_comparison(event['Surge'], surge_val, surge_measure):
-                        
-                        events.append(event)
-                else:
-                    pass
-                
-        bundle = {'Events': events, 
-                  'Prob': self.prob_measure(events)}
+    return quotient
+
+def tensor_reduce(tensors):
+    
+    # Merges grids pairwise in a balanced tree, so operands stay similar in size
+    while len(tensors) > 1:
+        merged = [tensor_convolve(tensors[i], tensors[i + 1]) for i in range(0, len(tensors) - 1, 2)]
+        if len(tensors) % 2:
+            merged.append(tensors[-1])
+        tensors = merged
+        
+    return tensors[0]
+
+def table_index(value, measure, size):
+    
+    # Cell of a cumulative table that answers 'measure value' along an axis of the given size, or None if no outcome qualifies
+    if measure == 'exact':
+        return value if 0 <= value < size else None
+    elif measure == 'great':
+        return max(value, 0) if value < size else None
+    else:
+        return min(value, size - 1) if value >= 0 else None
+
+def net_damage(atk_pool, def_pool):
+    """
+    Net damage of an attack pool against a defense pool: damage = max(0, hearts - shields), and a miss deals no damage.
+    Returns {'Damage': {'exact', 'less', 'great'}} lists indexed by damage, like the pools' curves().
+    """
+    
+    # Both pool keys carry their engine, so pools on different engines never share an entry
+    key = ('Damage', atk_pool.pool_key(), def_pool.pool_key())
+    curves = distribution_cache.get(key)
+    
+    if curves is None:
+        atk_curves = atk_pool.curves()
         
-        return bundle
-                        
-    def event_comparison(self, event_val, value, measure):
+        # Object arrays keep the exact engine in Fractions; the numpy engine stays in floats
+        dtype = float if atk_pool.engine == 'numpy' else object
+        hearts = np.array(atk_curves['Heart']['exact'], dtype = dtype)
+        shields = np.array(def_pool.curves()['Shield']['exact'], dtype = dtype)
         
-        if measure == 'exact':
-            
-            if event_val == value:
-                return True
-            else:
-                return False
+        # Entry i of the correlation is the probability that hearts - shields = i - max shields
+        difference = np.convolve(hearts, shields[::-1])
+        offset = len(shields) - 1
+        
+        no_damage = atk_curves['Miss'] + difference[:offset + 1].sum()
+        pmf = [no_damage if dtype is object else float(no_damage)] + difference[offset + 1:].tolist()
+        curves = {'Damage': cumulate(pmf)}
+        distribution_cache.put(key, curves)
+        
+    return curves
+
+# Die definitions shipped with Diiscent; pools take another file for custom dice
+DICE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dice.json')
+
+# Parsed definition files, by path, and compile_die() results, by (definition hash, colour)
+definitions = {}
+compiled_dice = {}
+
+def load_dice(path = DICE_FILE):
+    """
+    Reads a die definition file: {kind: {'Symbols': [...], 'Dice': {colour: [face, ...]}}}, colours in file order.
+    A face gives its symbol counts (symbols left out count 0) and an integer 'Weight' (default 1), or is a miss:
+    {'Miss': true, 'Weight': 1}. A face's probability is its weight over the total weight of the die.
+    Returns {kind: (symbols, {colour: faces})} with the faces in bundle form, e.g. {'Heart': 2, ..., 'Prob': Fraction(1, 2)}.
+    """
+    
+    if path not in definitions:
+        with open(path) as file:
+            data = json.load(file)
             
-        elif measure == 'great':
+        kinds = {}
+        for kind, definition in data.items():
+            symbols = list(definition['Symbols'])
+            kinds[kind] = (symbols, {colour: parse_faces(kind + ' ' + colour, symbols, faces) for colour, faces in definition['Dice'].items()})
             
-            if event_val >= value:
-                return True
-            else:
-                return False
+        definitions[path] = kinds
+        
+    return definitions[path]
+    
+def parse_faces(name, symbols, faces):
+
+    # Faces of one die from the definition file, in bundle form
+    for face in faces:
+    
+        unknown = set(face) - set(symbols) - {'Miss', 'Weight'}
+        if unknown:
+            raise ValueError('Unknown symbol on the ' + name + ' die: ' + ', '.join(sorted(unknown)))
             
-        else:
+        weight = face.get('Weight', 1)
+        if not isinstance(weight, int) or weight <= 0:
+            raise ValueError('Face weights must be positive whole numbers, got ' + repr(weight) + ' on the ' + name + ' die')
             
-            if event_val <= value:
-                return True
-            else:
+        for symbol in symbols:
+            if not isinstance(face.get(symbol, 0), int) or face.get(symbol, 0) < 0:
+                raise ValueError('Symbol counts must be whole numbers from 0, got ' + repr(face[symbol]) + ' on the ' + name + ' die')
                 
-                return False
-                  
-    def prob_measure(self, events):
+    total = sum(face.get('Weight', 1) for face in faces)
+    bundles = []
+    
+    for face in faces:
+        bundle = dict.fromkeys(symbols, 'Miss') if face.get('Miss') else {symbol: face.get(symbol, 0) for symbol in symbols}
+        bundle['Prob'] = Fraction(face.get('Weight', 1), total)
+        bundles.append(bundle)
         
-        # Provides the total probability for a selection of events
-        prob = 0
+    return bundles
+    
+def compile_die(faces, symbols):
+    """
+    Array form of one die, as used by every engine:
+    (values: faces x symbols int64 array with zeros on miss faces, miss: per-face bool array,
+     weights: per-face int64 array of outcome counts, denominator: total of the weights).
+    """
+    
+    denominator = 1
+    for face in faces:
+        denominator = lcm(denominator, face['Prob'].denominator)
         
-        for event in events:
+    miss = np.array([face[symbols[0]] == 'Miss' for face in faces], dtype = bool)
+    values = np.array([[0 if missed else face[symbol] for symbol in symbols] for face, missed in zip(faces, miss)], dtype = np.int64).reshape(len(faces), len(symbols))
+    weights = np.array([face['Prob'].numerator*(denominator//face['Prob'].denominator) for face in faces], dtype = np.int64)
+    
+    for array in (values, miss, weights):
+        array.setflags(write = False)
+        
+    return values, miss, weights, denominator
+    
+class DicePool:
+
+    def __init__(self, kind, engine = 'exact', path = DICE_FILE):
+        """
+        A pool of dice of one kind ('Attack', 'Defense' or any custom kind) from a die definition file (see load_dice).
+        
+        Terminology:
+        - Event: Given a collection of dice, an event describes a possible roll outcome in terms of the number of each symbol.
+        - Bundle: A bundle is an event, taken together with its associated probability.
+        - Miss: A face that voids the whole roll; its events have 'Miss' for every symbol.
+        
+        Engines:
+        - 'exact': Dice are integer count grids combined by array convolution, with Fraction probabilities at the end.
+        - 'numpy': Dice are float probability grids combined by array convolution.
+        Both grids have one axis per symbol and leave miss faces out; the miss chance is worked out exactly from the faces.
+        """
+        
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine: ' + str(engine))
             
-            prob += event['Prob']
+        kinds = load_dice(path)
+        if kind not in kinds:
+            raise ValueError('No ' + str(kind) + ' dice in ' + path)
             
-        return prob
+        symbols, dice = kinds[kind]
+        
+        self.kind = kind
+        self.engine = engine
+        self.digest = None
+        self.event_keys = list(symbols)
+        self.colours = list(dice)
+        self.state = dict.fromkeys(self.colours, 0)
+        self.miss_key = ('Miss',)*len(self.event_keys)
+        
+        # Every pool holds its own faces, so a pool can be edited (e.g. rerolls.reroll_faces) without touching the others
+        self.dice = {colour: [dict(face) for face in faces] for colour, faces in dice.items()}
+        
+        hits = {colour: [face for face in faces if face[self.event_keys[0]] != 'Miss'] for colour, faces in self.dice.items()}
+        self.symbol_max = {symbol: {colour: max((face[symbol] for face in hits[colour]), default = 0) for colour in self.colours} for symbol in self.event_keys}
+        self.symbol_min = {symbol: {colour: min((face[symbol] for face in hits[colour]), default = 0) for colour in self.colours} for symbol in self.event_keys}
+        self.can_miss = any(len(hits[colour]) < len(self.dice[colour]) for colour in self.colours)
+        
+    def composition(self):
     
-    def grab_event(self, event):
+        # Canonical dice counts, identical for every pool holding the same dice
+        return tuple((colour, self.state[colour]) for colour in self.colours if self.state[colour] != 0)
         
-        keys = ['Heart', 'Range', 'Surge']
+    def definition_hash(self):
+    
+        # Fingerprint of the die faces, so cached distributions are dropped whenever a die definition changes.
+        # Worked out once per pool; clear self.digest after editing a die in place
+        if self.digest is None:
+            self.digest = hashlib.sha1(repr((self.event_keys, self.dice)).encode()).hexdigest()[:16]
+            
+        return self.digest
         
-        return {key: event[key] for key in keys}
+    def cache_key(self, form):
+    
+        return (self.kind, form, self.definition_hash()) + self.composition()
         
-    def max_heart(self):
+    def pool_key(self):
+    
+        return self.cache_key(self.engine)
         
-        m_heart = 0
-        for colour in self.atk_colours:
-            m_heart += self.heart_max[colour]*self.atk_state[colour]
+    def roll(self):
+    
+        key = self.pool_key()
+        total_bundle = distribution_cache.get(key)
+        
+        if total_bundle is None:
+            total_bundle = self.convolve()
+            distribution_cache.put(key, total_bundle)
             
-        return m_heart
-     
-    def max_range(self):
+        return total_bundle
         
-        m_range = 0
-        for colour in self.atk_colours:
-            m_range += self.range_max[colour]*self.atk_state[colour]
+    def convolve(self):
+    
+        if self.engine == 'numpy':
+            return self.tensor_bundles(*self.tensor())
             
-        return m_range
+        # Probabilities only become Fractions here, once per distinct event
+        counts, denominator = self.counts()
+        
+        return [dict(zip(self.event_keys, key), Prob = Fraction(count, denominator)) for key, count in counts.items()]
+        
+    def compiled(self, colour):
     
-    def fraction_rounder(self,fraction):
+        # compile_die() of one colour, built once per die definition
+        key = (self.definition_hash(), colour)
+        
+        if key not in compiled_dice:
+            compiled_dice[key] = compile_die(self.dice[colour], self.event_keys)
+            
+        return compiled_dice[key]
+        
+    def die_shape(self, colour):
     
-        numer = fraction.numerator
-        denom = fraction.denominator
-        value = numer/denom
+        return tuple(self.symbol_max[symbol][colour] + 1 for symbol in self.event_keys)
         
-        if 0.1 <= value and value < 1:
-            return round(value,1)
-        elif 0.01 <= value and value < 0.1:
-            return round(value, 2)
-        elif 0.001 <= value and value < 0.01:
-            return round(value, 3)
-        else:
-            return round(value)
-
-    def atk_plot(self, kind = 'Heart', measure = 'great'):
- 
-        probs = []
+    def die_counts(self, colour):
+    
+        # Integer weight of every face over the die's common denominator (6 for every Descent die)
+        values, miss, weights, denominator = self.compiled(colour)
+        counts = {}
         
-        if measure == 'exact':
-                str_kind = 'exactly'
-        elif measure == 'great':
-            str_kind = 'at least'
-        else:
-            str_kind = 'less than'
-                
-        if kind == 'Heart':
+        for row, missed, weight in zip(values.tolist(), miss.tolist(), weights.tolist()):
+            key = self.miss_key if missed else tuple(row)
+            counts[key] = counts.get(key, 0) + weight
             
-            maxh = self.max_heart()
-
-            # Construct Values and Include Misses (if necessary)
-            if self.atk_state['Blue'] != 0:
-                probs.append(self.event_select('Miss')['Prob']*100)
-                
-                # Construct Values
-                x_axis = [i for i in range(maxh+2)]
-                values = [i-1 for i in range(maxh+2)]
-                values[0] = 'Miss'
+        return counts, denominator
+        
+    def counts(self):
+        """
+        Returns (counts, denominator) for the current pool: counts maps each event key to its number of
+        equally likely outcomes out of denominator (6**n for n dice). All arithmetic stays in integers.
+        """
+        
+        key = self.cache_key('counts')
+        result = distribution_cache.get(key)
+        
+        if result is None:
+            table = self.table_lookup()
+            
+            if table is not None:
+                result = self.grid_counts(*table)
             else:
-                x_axis = [i for i in range(maxh+1)]
-                values= [str(i) for i in range(maxh+1)]
+                result = disk_cache.load_counts(key)
                 
-            for val in range(maxh+1):
-                probs.append(self.event_select(heart_val = val, heart_measure = measure)['Prob']*100)
+            if result is None:
+                denominator = 1
+                for colour, num_dice in self.composition():
+                    denominator *= self.compiled(colour)[3]**num_dice
+                    
+                # Object arrays hold Python integers for pools too large for int64
+                dtype = np.int64 if denominator < 2**62 else object
+                grid = tensor_reduce([np.ones((1,)*len(self.event_keys), dtype = dtype)] + [self.colour_tensor(colour, num_dice, dtype) for colour, num_dice in self.composition()])
+                
+                result = self.grid_counts(grid, denominator)
+                disk_cache.save_counts(key, *result)
+                
+            distribution_cache.put(key, result)
             
-            print(values)
-            print(probs)
+        return result
+        
+    def die_count_tensor(self, colour):
+    
+        # Integer version of die_tensor: (grid of face counts, die denominator), used to build lookup tables
+        values, miss, weights, denominator = self.compiled(colour)
+        tensor = np.zeros(self.die_shape(colour), dtype = np.int64)
+        np.add.at(tensor, tuple(values[~miss].T), weights[~miss])
+        
+        return tensor, denominator
+        
+    def table_lookup(self):
+    
+        # (count grid, denominator) sliced from a prebuilt lookup table, or None when no table covers this pool
+        table = load_table(self.kind, self.definition_hash(), len(self.colours))
+        
+        if table is None:
+            return None
             
-            bar = plt.bar(x = x_axis, height = probs)
-            ind = 0
+        return table.grid(tuple(self.state[colour] for colour in self.colours))
+        
+    def grid_counts(self, grid, denominator):
+    
+        # Converts a count grid back to the counts() form; whatever the grid lacks is the miss count
+        counts = {}
+        miss = denominator - int(grid.sum())
+        
+        if miss != 0:
+            counts[self.miss_key] = miss
+            
+        index = np.nonzero(grid)
+        for event, count in zip(zip(*(axis.tolist() for axis in index)), grid[index].tolist()):
+            counts[event] = count
+            
+        return counts, denominator
+        
+    def count_combine(self, counts_A, counts_B):
+    
+        # Integer counterpart of bundle_combine: products of counts accumulated under the combined event key
+        counts = {}
+        
+        for key_a, count_a in counts_A.items():
+        
+            for key_b, count_b in counts_B.items():
+            
+                if key_a[0] == 'Miss' or key_b[0] == 'Miss':
+                    key = self.miss_key
+                else:
+                    key = tuple(a + b for a, b in zip(key_a, key_b))
+                counts[key] = counts.get(key, 0) + count_a*count_b
+                
+        return counts
+        
+    def colour_tensor(self, colour, num_dice, dtype = float):
+    
+        # Per-colour partial result (num_dice dice of one colour), kept so pools sharing a colour count reuse it.
+        # Float partials hold probabilities, integer and object partials hold outcome counts
+        key = (self.kind, 'power-' + dtype.__name__, self.definition_hash(), colour, num_dice)
+        tensor = distribution_cache.get(key)
+        
+        if tensor is None:
+            die = self.die_tensor(colour) if dtype is float else self.die_count_tensor(colour)[0].astype(dtype)
+            tensor = tensor_power(die, num_dice)
+            tensor.setflags(write = False)
+            distribution_cache.put(key, tensor)
             
-            for rect in bar:
-                height = rect.get_height()
-                plt.text(rect.get_x() + rect.get_width()/2, height, str(self.fraction_rounder(probs[ind])) + "%", 
-                         ha = 'center', va = 'bottom', size = 8)
-                ind+=1
+        return tensor
+        
+    def add_die(self, colour):
+    
+        # Adds one die, convolving just that die into the current distribution when the new pool is not cached yet
+        if self.engine == 'numpy':
+            miss, previous = self.tensor()
+        else:
+            previous_counts, previous_denominator = self.counts()
             
-            plt.xlabel('Hearts')
-            plt.ylabel('Probability (%)')
-            plt.xticks(x_axis, values)    
-            plt.title('Probability of Rolling ' + str_kind + ' X Hearts', y = 1.08)
-            plt.ylim(0,100)
-            plt.show()
+        self.state[colour] += 1
+        
+        if self.engine == 'numpy':
+            key = self.cache_key('tensor')
             
+            if not distribution_cache.contains(key):
+                total = tensor_convolve(previous, self.die_tensor(colour))
+                total.setflags(write = False)
+                distribution_cache.put(key, (self.miss_chance(), total))
         else:
+            key = self.cache_key('counts')
             
-            maxr = self.max_range()
-
-            if self.atk_state['Blue'] != 0:
-                probs.append(self.event_select(heart_val = 'Miss')['Prob']*100)
+            if not distribution_cache.contains(key):
+                die, die_denominator = self.die_counts(colour)
+                distribution_cache.put(key, (self.count_combine(previous_counts, die), previous_denominator*die_denominator))
                 
-                # Construct Values
-                x_axis = [i for i in range(maxr+2)]
-                values = [i-1 for i in range(maxr+2)]
-                values[0] = 'Miss'
-            else:
-                x_axis = [i for i in range(maxr+1)]
-                values= [str(i) for i in range(maxr+1)]
+    def remove_die(self, colour):
+    
+        # Removes one die. The exact engine divides the die back out of the current counts; the numpy engine
+        # rebuilds from its cached per-colour partials, since float deconvolution is not stable
+        if self.engine == 'numpy':
+            self.state[colour] -= 1
+            return
+            
+        previous_counts, previous_denominator = self.counts()
+        self.state[colour] -= 1
+        key = self.cache_key('counts')
+        
+        if not distribution_cache.contains(key):
+            die, die_denominator = self.die_counts(colour)
+            die_hits = {event: count for event, count in die.items() if event[0] != 'Miss'}
+            
+            # A die that only misses wiped out every other die's hits, so there is nothing to divide: counts() rebuilds
+            if not die_hits:
+                return
+                
+            # Misses absorb every other die, so only the non-miss part needs dividing
+            hits = {event: count for event, count in previous_counts.items() if event[0] != 'Miss'}
+            counts = count_divide(hits, die_hits)
+            denominator = previous_denominator//die_denominator
+            miss = denominator - sum(counts.values())
+            
+            if miss != 0:
+                counts = dict([(self.miss_key, miss)] + list(counts.items()))
                 
-            for val in range(maxr+1):
-                probs.append(self.event_select(range_val = val, range_measure = measure)['Prob']*100)
+            distribution_cache.put(key, (counts, denominator))
             
-            print(values)
-            print(probs)
-
-            bar = plt.bar(x = x_axis, height = probs)
-            ind = 0
-            
-            for rect in bar:
-                height = rect.get_height()
-                plt.text(rect.get_x() + rect.get_width()/2, height, str(self.fraction_rounder(probs[ind])) + "%", ha = 'center', va = 'bottom', 
-                         size = 8)
-                ind+=1
-            
-            plt.xlabel('Range')
-            plt.ylabel('Probability (%)')
-            plt.xticks(x_axis, values)
-            plt.title('Probability of Rolling ' + str_kind + ' X Range', y = 1.08)
-            plt.ylim(0,100)
-            plt.show()
-              
-class DefensePool:
-    
-    def __init__(self):
-        """
-        Terminology:
-        - Event: Given a collection of dice, an event describes a possible roll outcome in terms of number of hearts, range and surges.
-        - Bundle: A bundle is an event, taken together with its associated probability.
-        """
+    def miss_chance(self):
+    
+        # Exact probability that at least one die rolls a miss, as a float
+        hit = Fraction(1)
+        for colour, num_dice in self.composition():
+            values, miss, weights, denominator = self.compiled(colour)
+            hit *= Fraction(int(weights[~miss].sum()), denominator)**num_dice
+            
+        return float(1 - hit)
         
-        self.def_colours = ['Black', 'Grey', 'Brown']
-        self.event_keys = ['Shield']
-        
-        self.def_state = {'Black': 0,
-                          'Grey': 0,
-                          'Brown': 0
-                          }
-        
-        self.black_die =  [{'Shield': 0, 'Prob': Fraction(1,6)},
-                           {'Shield': 2, 'Prob': Fraction(1,2)},
-                           {'Shield': 3, 'Prob': Fraction(1,6)},
-                           {'Shield': 4, 'Prob': Fraction(1,6)}
-                           ]
-        
-        self.grey_die =  [{'Shield': 0, 'Prob': Fraction(1,6)},
-                          {'Shield': 1, 'Prob': Fraction(1,2)},
-                          {'Shield': 2, 'Prob': Fraction(1,6)},
-                          {'Shield': 3, 'Prob': Fraction(1,6)}
-                          ]
-        
-        self.brown_die =  [{'Shield': 0, 'Prob': Fraction(1,2)},
-                           {'Shield': 1, 'Prob': Fraction(1,3)},
-                           {'Shield': 2, 'Prob': Fraction(1,6)}
-                           ]
-        
-        self.shield_max = {'Black': 4,
-                           'Grey': 3,
-                           'Brown': 2
-                           }
-        
-        self.dice = {'Black': self.black_die,
-                     'Grey': self.grey_die,
-                     'Brown': self.brown_die
-                    }
+    def die_tensor(self, colour):
+    
+        # Grid of non-miss probabilities with one axis per symbol; a miss face leaves its mass out of the grid
+        tensor, denominator = self.die_count_tensor(colour)
         
-    def roll(self):
+        return tensor/denominator
         
-        dice = []
+    def tensor(self):
+        """
+        Returns (miss probability, grid) for the current pool, where grid[h, r, s] (one index per symbol) is the
+        probability of rolling exactly those symbol counts without a miss.
+        """
+        
+        key = self.cache_key('tensor')
+        result = distribution_cache.get(key)
         
-        for colour in self.def_colours:
-            for num_die in range(self.def_state[colour]):
-                dice.append(self.dice[colour])
+        if result is None:
+            table = self.table_lookup()
+            
+            if table is not None:
+                total = table[0]/table[1]
+            else:
+                total = disk_cache.load_tensor(key)
+                
+            if total is None:
+            
+                # One convolution power per colour, then a balanced merge of the colours
+                total = tensor_reduce([np.ones((1,)*len(self.event_keys))] + [self.colour_tensor(colour, num_dice) for colour, num_dice in self.composition()])
+                disk_cache.save_tensor(key, total)
                 
-        total_bundle = dice[0]   
+            total.setflags(write = False)
+            
+            # The miss chance comes from the dice themselves, so pools that cannot miss never pick up rounding noise
+            result = (self.miss_chance(), total)
+            distribution_cache.put(key, result)
+            
+        return result
+        
+    def tensor_bundles(self, miss, tensor):
+    
+        bundles = []
         
-        for die in dice[1::]:
+        if miss != 0:
+            bundles.append(dict(zip(self.event_keys, self.miss_key), Prob = miss))
             
-            total_bundle = self.bundle_combine(total_bundle,die)
+        for index in zip(*np.nonzero(tensor)):
+            bundles.append(dict(zip(self.event_keys, (int(i) for i in index)), Prob = float(tensor[index])))
             
-        return total_bundle
+        return bundles
         
     def bundle_combine(self, bundle_A, bundle_B):
         
         # Not strictly just single dice. Combines two object events such as 
         # 1) Collection of two dice and 
         # 2) a (third) independent die
-        bundles = []
-        events = []
+        # Probabilities are accumulated under their event key, and bundles are only built once per distinct event
+        probs = {}
+        events_B = [(self.event_key(bundle_b), bundle_b['Prob']) for bundle_b in bundle_B]
         
         for bundle_a in bundle_A:
+            
+            key_a, prob_a = self.event_key(bundle_a), bundle_a['Prob']
+            
+            for key_b, prob_b in events_B:
                 
-            for bundle_b in bundle_B:
-                
-                new_bundle = self.combine_bundles(bundle_a, bundle_b)
-                new_event = self.grab_event(new_bundle)
-                
-                if new_event in events:
-                    bundles[self.iloc_bundle_match(bundles, new_event)]['Prob'] += new_bundle['Prob']
+                if key_a[0] == 'Miss' or key_b[0] == 'Miss':
+                    key = self.miss_key
                 else:
-                    events.append(new_event)
-                    bundles.append(new_bundle)
-                    
-        return bundles
-                
-    def iloc_bundle_match(self, bundles, target):
-        iloc = 0
-        
-        for bundle in bundles:
-            
-            if self.grab_event(bundle) == target:
-        
-                return iloc
-            else:
-                iloc+=1
+                    key = tuple(map(add, key_a, key_b))
+                probs[key] = probs.get(key, 0) + prob_a*prob_b
                 
-    def combine_bundles(self, bundle_1, bundle_2):
-        # Adds 2 Independent Bundles together
-        
-        combined_bundle = {'Shield': bundle_1['Shield'] + bundle_2['Shield'],
-                 'Prob': bundle_1['Prob']*bundle_2['Prob']
-                 }
+        return [dict(zip(self.event_keys, key), Prob = prob) for key, prob in probs.items()]
+    
+    def event_key(self, bundle):
         
-        return combined_bundle
+        return tuple(bundle[key] for key in self.event_keys)
     
     def grab_event(self, event):
+    
+        return {key: event[key] for key in self.event_keys}
         
-        return {'Shield': event['Shield']}
+    def select_events(self, values, measures):
     
-    def event_select(self, shield_val, shield_measure = 'great'):
+        # Events meeting every (value, measure) comparison, one per symbol; values[0] == 'Miss' selects the misses
+        symbol = self.event_keys[0]
         
-        events = []
-
-        for event in self.roll():
-                
-            if self.event_comparison(event['Shield'], shield_val, shield_measure):
-                events.append(event)
-
-                
-        bundle = {'Events': events, 
+        if values[0] == 'Miss':
+            events = [event for event in self.roll() if event[symbol] == 'Miss']
+        else:
+            events = [event for event in self.roll() if event[symbol] != 'Miss']
+            
+            # One filtering pass per symbol
+            for key, value, measure in zip(self.event_keys, values, measures):
+                compare = COMPARISONS.get(measure, le)
+                events = [event for event in events if compare(event[key], value)]
+            
+        bundle = {'Events': events,
                   'Prob': self.prob_measure(events)}
-        
+                  
         return bundle
-                        
-    def event_comparison(self, event_val, value, measure):
         
-        if measure == 'exact':
+    def select_prob(self, values, measures):
+    
+        # Same probability as select_events(...)['Prob'], answered with a single lookup in the joint cumulative table
+        if values[0] == 'Miss':
+            return self.curves()['Miss'] if self.can_miss else 0
             
-            if event_val == value:
-                return True
-            else:
-                return False
+        table, denominator = self.joint_table(*measures)
+        index = []
+        
+        for value, measure, size in zip(values, measures, table.shape):
+        
+            cell = table_index(value, measure, size)
             
-        elif measure == 'great':
+            if cell is None:
+                return 0
+                
+            index.append(cell)
             
-            if event_val >= value:
-                return True
-            else:
-                return False
+        if self.engine == 'numpy':
+            return float(table[tuple(index)])
             
+        return Fraction(int(table[tuple(index)]), denominator)
+        
+    def curves(self):
+        """
+        Distributions of every symbol for the current pool, built in a single pass.
+        - 'Miss': Probability of rolling a miss (only for kinds with miss faces).
+        - One entry per symbol: {'exact', 'less', 'great'} lists (PMF, CDF and survival curve) indexed by value.
+        Misses are excluded from the lists, matching select_events.
+        """
+        
+        key = self.cache_key('curves-' + self.engine)
+        curves = distribution_cache.get(key)
+        
+        if curves is not None:
+            return curves
+            
+        if self.engine == 'numpy':
+            miss, tensor = self.tensor()
+            curves = {'Miss': miss} if self.can_miss else {}
+            
+            for axis, kind in enumerate(self.event_keys):
+                curves[kind] = cumulate(tensor.sum(axis = tuple(other for other in range(tensor.ndim) if other != axis)).tolist())
         else:
+            counts, denominator = self.counts()
+            miss = 0
+            pmfs = {kind: [0]*(self.max_symbol(kind) + 1) for kind in self.event_keys}
             
-            if event_val <= value:
-                return True
+            for event, count in counts.items():
+                if event[0] == 'Miss':
+                    miss += count
+                else:
+                    for ind, kind in enumerate(self.event_keys):
+                        pmfs[kind][event[ind]] += count
+                        
+            # Cumulative sums stay in integer counts and become Fractions at the end
+            curves = {'Miss': Fraction(miss, denominator)} if self.can_miss else {}
+            for kind in self.event_keys:
+                curves[kind] = {measure: [Fraction(count, denominator) for count in curve] for measure, curve in cumulate(pmfs[kind]).items()}
+                
+        distribution_cache.put(key, curves)
+        
+        return curves
+        
+    def count_grid(self):
+    
+        # counts() as an integer grid with one axis per symbol, with misses left out
+        table = self.table_lookup()
+        
+        if table is not None:
+            return np.array(table[0])
+            
+        counts, denominator = self.counts()
+        
+        # Object arrays hold Python integers for pools too large for int64
+        dtype = np.int64 if denominator < 2**62 else object
+        grid = np.zeros(tuple(self.max_symbol(kind) + 1 for kind in self.event_keys), dtype = dtype)
+        
+        for event, count in counts.items():
+            if event[0] != 'Miss':
+                grid[event] = count
+                
+        return grid
+        
+    def joint_table(self, *measures):
+        """
+        Joint cumulative table over every symbol. Returns (table, denominator), where cell [h, r, s] divided by
+        denominator is the probability of a non-miss roll meeting every comparison against h, r and s.
+        The exact engine keeps integer outcome counts over 6**n; the numpy engine stores probabilities (denominator 1).
+        'great' axes are suffix sums, 'less' axes prefix sums and 'exact' axes are left as they are.
+        Built once per composition and combination of measures. Any other measure counts as 'less', as in COMPARISONS.
+        """
+        
+        measures = tuple(measure if measure in COMPARISONS else 'less' for measure in measures)
+        key = self.cache_key('joint-' + self.engine + '-' + '-'.join(measures))
+        result = distribution_cache.get(key)
+        
+        if result is None:
+            if self.engine == 'numpy':
+                table, denominator = np.array(self.tensor()[1]), 1
             else:
+                table, denominator = self.count_grid(), self.counts()[1]
                 
-                return False
+            for axis, measure in enumerate(measures):
+                if measure == 'great':
+                    table = np.flip(np.cumsum(np.flip(table, axis), axis = axis), axis)
+                elif measure == 'less':
+                    table = np.cumsum(table, axis = axis)
+                    
+            table.setflags(write = False)
+            result = (table, denominator)
+            distribution_cache.put(key, result)
+            
+        return result
+        
+    def event_comparison(self, event_val, value, measure):
+        
+        return COMPARISONS.get(measure, le)(event_val, value)
+    
+    def prob_measure(self, events):
+    
+        # Provides the total probability for a selection of events
+        prob = 0
+        
+        for event in events:
+        
+            prob += event['Prob']
             
+        return prob
+        
+    def max_symbol(self, symbol):
+    
+        total = 0
+        for colour in self.colours:
+            total += self.symbol_max[symbol][colour]*self.state[colour]
+            
+        return total
+        
     def fraction_rounder(self,fraction):
     
-        numer = fraction.numerator
-        denom = fraction.denominator
-        value = numer/denom
+        # Accepts Fraction (exact engine) and float (numpy engine) probabilities
+        value = float(fraction)
         
         if 0.1 <= value and value < 1:
             return round(value,1)
@@ -489,31 +833,90 @@ class DefensePool:
             return round(value, 3)
         else:
             return round(value)
-        
-    def max_shield(self):
             
-        total = 0
-        for colour in self.def_colours:
-            total += self.def_state[colour]*self.shield_max[colour]
+class AttackPool(DicePool):
+
+    def __init__(self, engine = 'exact', path = DICE_FILE):
+        """
+        Attack dice (Red, Yellow, Blue, Green), rolling hearts, range and surges; the blue die can miss.
+        """
         
-        return total
+        DicePool.__init__(self, 'Attack', engine, path)
+        
+        self.atk_colours = self.colours
+        self.heart_max = self.symbol_max['Heart']
+        self.range_max = self.symbol_max['Range']
+        self.surge_max = self.symbol_max['Surge']
+        self.heart_min = self.symbol_min['Heart']
+        self.range_min = self.symbol_min['Range']
+        
+    @property
+    def atk_state(self):
     
-    def prob_measure(self, events):
+        return self.state
         
-        prob = 0
+    @atk_state.setter
+    def atk_state(self, state):
+    
+        self.state = state
         
-        for event in events:
-            
-            prob += event['Prob']
-            
-        return prob
-
-
-
-
-
-
-
-
-
+    def event_select(self, heart_val=0, range_val = 0, surge_val = 0, heart_measure = 'great', range_measure = 'great', surge_measure = 'great'):
+    
+        return self.select_events((heart_val, range_val, surge_val), (heart_measure, range_measure, surge_measure))
+        
+    def prob_select(self, heart_val = 0, range_val = 0, surge_val = 0, heart_measure = 'great', range_measure = 'great', surge_measure = 'great'):
+    
+        return self.select_prob((heart_val, range_val, surge_val), (heart_measure, range_measure, surge_measure))
+        
+    def max_heart(self):
+    
+        return self.max_symbol('Heart')
+        
+    def max_range(self):
+    
+        return self.max_symbol('Range')
+        
+    def max_surge(self):
+    
+        return self.max_symbol('Surge')
+        
+    def atk_plot(self, kind = 'Heart', measure = 'great'):
+    
+        # Matplotlib is only loaded once something is actually plotted
+        from plotting import atk_plot
+        
+        atk_plot(self, kind, measure)
+        
+class DefensePool(DicePool):
 
+    def __init__(self, engine = 'exact', path = DICE_FILE):
+        """
+        Defense dice (Black, Grey, Brown), rolling shields.
+        """
+        
+        DicePool.__init__(self, 'Defense', engine, path)
+        
+        self.def_colours = self.colours
+        self.shield_max = self.symbol_max['Shield']
+        
+    @property
+    def def_state(self):
+    
+        return self.state
+        
+    @def_state.setter
+    def def_state(self, state):
+    
+        self.state = state
+        
+    def event_select(self, shield_val, shield_measure = 'great'):
+    
+        return self.select_events((shield_val,), (shield_measure,))
+        
+    def prob_select(self, shield_val, shield_measure = 'great'):
+    
+        return self.select_prob((shield_val,), (shield_measure,))
+        
+    def max_shield(self):
+    
+        return self.max_symbol('Shield')
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+
+def default_directory():
+
+    # DIISCENT_CACHE_DIR overrides the per-user cache location
+    return os.environ.get('DIISCENT_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'diiscent'))
+
+def atomic_write(path, save):
+
+    # save(file) writes to a uniquely named temporary file next to path, which then replaces path in one step,
+    # so readers never see a half-written file and concurrent writers never share a temporary file
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok = True)
+    handle, temp_path = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            save(file)
+
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class DiskCache:
+
+    def __init__(self, directory = None, enabled = True):
+        """
+        On-disk store of pool distributions that survives restarts.
+        - Keys: Tuples such as ('Attack', 'counts', <definition hash>, ('Red', 2), ('Blue', 1)). The hash of the
+          die-face definitions is part of every key, so editing a die never serves a stale distribution.
+        - Grids (numpy engine) are stored as .npy files and memory-mapped on load.
+        - Counts (exact engine) are stored as JSON, which keeps arbitrarily large integers exact.
+        Failures to read or write are treated as cache misses: the store is only ever an optimisation.
+        """
+
+        self.directory = directory if directory is not None else default_directory()
+        self.enabled = enabled and os.environ.get('DIISCENT_DISK_CACHE', '1') != '0'
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key, extension):
+
+        # Kind, form and definition hash stay readable; the dice composition is hashed from its repr, since colour
+        # names from a custom dice file can contain any character (and 'D' x12 must not collide with 'D1' x2)
+        names = [str(part) for part in key if not isinstance(part, tuple)]
+        composition = tuple(part for part in key if isinstance(part, tuple))
+        names.append(hashlib.sha1(repr(composition).encode()).hexdigest()[:16])
+
+        return os.path.join(self.directory, '-'.join(names) + extension)
+
+    def write(self, path, save):
+
+        # Write to a temporary file first so a crash never leaves a truncated entry behind
+        try:
+            atomic_write(path, save)
+        except OSError:
+            pass
+
+    def load_tensor(self, key):
+
+        if not self.enabled:
+            return None
+
+        try:
+            tensor = np.load(self.path(key, '.npy'), mmap_mode = 'r')
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return tensor
+
+    def save_tensor(self, key, tensor):
+
+        if self.enabled:
+            self.write(self.path(key, '.npy'), lambda file: np.save(file, np.asarray(tensor)))
+
+    def load_counts(self, key):
+
+        if not self.enabled:
+            return None
+
+        try:
+            with open(self.path(key, '.json')) as file:
+                data = json.load(file)
+
+            counts = {tuple(entry[:-1]): entry[-1] for entry in data['Counts']}
+            denominator = data['Denominator']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return counts, denominator
+
+    def save_counts(self, key, counts, denominator):
+
+        if self.enabled:
+            data = {'Denominator': denominator,
+                    'Counts': [list(event) + [count] for event, count in counts.items()]
+                    }
+            self.write(self.path(key, '.json'), lambda file: file.write(json.dumps(data).encode()))
+
+    def clear(self):
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+
+        for name in names:
+            if name.endswith(('.npy', '.json', '.tmp')):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def info(self):
+
+        return {'Hits': self.hits,
+                'Misses': self.misses,
+                'Directory': self.directory,
+                'Enabled': self.enabled
+                }
+
+disk_cache = DiskCache()
@@ -0,0 +1,124 @@
+"""
+Structured logging and timing spans.
+
+- logger / log_event(): 'event key=value ...' records through the standard logging module. The level comes from the
+  DIISCENT_LOG environment variable (e.g. DIISCENT_LOG=DEBUG) and defaults to WARNING, so debug records cost one
+  level check when they are off.
+- spans: Timings of the hot paths, e.g. one GUI interaction split into 'compute' (worker), 'render' (matplotlib),
+  'widgets' (Tk widget rebuilds) and 'paint' (until Tk is idle again). The most recent spans are kept in memory for
+  the GUI's timing overlay, and can be dumped as JSON lines; DIISCENT_SPANS=<path> dumps them when the process exits.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Number of spans kept in memory
+SPAN_HISTORY = 5000
+
+logger = logging.getLogger('diiscent')
+
+
+def configure_logging(level = None):
+
+    # Idempotent: the handler is only added once per process
+    level = level if level is not None else os.environ.get('DIISCENT_LOG', 'WARNING')
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(threadName)s %(message)s'))
+        logger.addHandler(handler)
+
+def format_fields(fields):
+
+    return ' '.join(key + '=' + (value if isinstance(value, str) else repr(value)) for key, value in fields.items())
+
+def log_event(event, level = logging.DEBUG, **fields):
+    """
+    Logs 'event key=value ...'. Fields are only formatted when the level is enabled.
+    """
+
+    if logger.isEnabledFor(level):
+        logger.log(level, event + (' ' + format_fields(fields) if fields else ''))
+
+class SpanRecorder:
+
+    def __init__(self, history = SPAN_HISTORY):
+        """
+        Thread-safe store of recent spans: {'name', 'start' (perf_counter seconds), 'duration' (seconds), 'thread',
+        plus any fields given}.
+        """
+
+        self.spans = deque(maxlen = history)
+        self.lock = threading.Lock()
+
+    def begin(self):
+
+        return time.perf_counter()
+
+    def end(self, name, start, **fields):
+
+        duration = time.perf_counter() - start
+        span = dict(fields, name = name, start = start, duration = duration, thread = threading.current_thread().name)
+
+        with self.lock:
+            self.spans.append(span)
+
+        log_event('span ' + name, ms = round(1000*duration, 3), **fields)
+
+        return duration
+
+    @contextmanager
+    def span(self, name, **fields):
+
+        start = self.begin()
+
+        try:
+            yield
+        finally:
+            self.end(name, start, **fields)
+
+    def recent(self):
+
+        with self.lock:
+            return list(self.spans)
+
+    def summary(self):
+
+        # {name: {'count', 'mean ms', 'max ms', 'last ms'}} over the spans in memory
+        summary = {}
+
+        for span in self.recent():
+
+            entry = summary.setdefault(span['name'], {'count': 0, 'total': 0, 'max ms': 0})
+            entry['count'] += 1
+            entry['total'] += span['duration']
+            entry['max ms'] = max(entry['max ms'], 1000*span['duration'])
+            entry['last ms'] = 1000*span['duration']
+
+        for entry in summary.values():
+            entry['mean ms'] = 1000*entry.pop('total')/entry['count']
+
+        return summary
+
+    def dump(self, path):
+
+        with open(path, 'w') as file:
+            for span in self.recent():
+                file.write(json.dumps(span, default = str) + '\n')
+
+    def clear(self):
+
+        with self.lock:
+            self.spans.clear()
+
+spans = SpanRecorder()
+
+if os.environ.get('DIISCENT_SPANS'):
+    atexit.register(lambda: spans.dump(os.environ['DIISCENT_SPANS']))
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+from diskcache import disk_cache
+
+
+def table_paths(kind, digest, directory = None):
+
+    # A table is a pair of .npy files: the flattened count grids and an index of where each pool's grid sits
+    directory = directory if directory is not None else disk_cache.directory
+    name = kind + '-%s-' + digest + '.npy'
+
+    return os.path.join(directory, name % 'table'), os.path.join(directory, name % 'index')
+
+class LookupTable:
+
+    def __init__(self, data, index, num_colours):
+        """
+        Precomputed count grids for every pool composition up to the pool cap (see build_tables.py).
+        - data: Every grid flattened and concatenated into one int64 array (memory-mapped).
+        - index: One row per composition: dice counts per colour, offset into data, denominator, grid shape.
+        """
+
+        self.data = data
+        self.rows = {}
+
+        for row in index.tolist():
+            counts = tuple(row[:num_colours])
+            offset, denominator = row[num_colours], row[num_colours + 1]
+            shape = tuple(row[num_colours + 2:])
+
+            self.rows[counts] = (offset, denominator, shape)
+
+    @classmethod
+    def open(cls, kind, digest, num_colours, directory = None):
+
+        data_path, index_path = table_paths(kind, digest, directory)
+
+        try:
+            data = np.load(data_path, mmap_mode = 'r')
+            index = np.load(index_path)
+        except (OSError, ValueError):
+            return None
+
+        return cls(data, index, num_colours)
+
+    def grid(self, counts):
+
+        # Returns (count grid, denominator) for the given dice counts, or None if the table does not cover them
+        if counts not in self.rows:
+            return None
+
+        offset, denominator, shape = self.rows[counts]
+        size = int(np.prod(shape))
+
+        return self.data[offset:offset + size].reshape(shape), denominator
+
+tables = {}
+
+def load_table(kind, digest, num_colours, directory = None):
+
+    # Tables live in the disk cache directory and are switched off with it (DIISCENT_DISK_CACHE=0).
+    # They are opened at most once per process; a missing table is remembered as None
+    if not disk_cache.enabled:
+        return None
+
+    key = (kind, digest, directory)
+
+    if key not in tables:
+        tables[key] = LookupTable.open(kind, digest, num_colours, directory)
+
+    return tables[key]
@@ -3,13 +3,20 @@ from matplotlib import pyplot as plt
 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
-from PIL import Image, ImageTk
 from matplotlib import rcParams
+import multiprocessing
+import queue
 import sys
+import threading
 import tkinter as tk
+from tkinter import filedialog
 from tkinter import ttk
 
-from dicepool import AttackPool, DefensePool
+from assets import photo_image
+from dicepool import AttackPool
+from instrument import configure_logging, log_event, spans
+from montecarlo import simulate_iter
+from worker import ComputeWorker
 
 mpl.use("TkAgg")
 plt.style.use("ggplot")
@@ -18,6 +25,23 @@ rcParams.update({"figure.autolayout": True})
 
 LARGE_FONT = ("Verdana", 12)
 
+# How often (ms) the GUI checks the compute worker for results
+POLL_INTERVAL = 15
+
+# Changes made within this window (ms) are redrawn together
+REDRAW_DELAY = 40
+
+# The layout is only recomputed once the window has kept its size for this long (ms)
+RESIZE_SETTLE = 150
+
+# Backgrounds are cached in steps of this many pixels, so resizing reuses nearby resolutions
+BACKGROUND_STEP = 100
+
+BACKGROUNDS = {0: "Images/Woodland.jpg", 1: "Images/DarkTheme.jpg"}
+
+# How often (ms) the timing overlay is refreshed
+OVERLAY_INTERVAL = 500
+
 
 class WinMain(tk.Tk):
 
@@ -28,7 +52,7 @@ class WinMain(tk.Tk):
 
         # Aesthetic Properties
         self.height = 760
-        self.width = 1000
+        self.width = 1500
         tk.Tk.wm_title(self, "Diiscent")
         if sys.platform.startswith("win"):
             tk.Tk.iconbitmap(self, bitmap="Images/descent_icon.ico")
@@ -36,7 +60,7 @@ class WinMain(tk.Tk):
             self.tk.call('wm', 'iconphoto', self._w, tk.PhotoImage(file="Images/descent_icon.png"))
 
         tk.Tk.geometry(self, str(self.width) + "x" + str(self.height))
-        tk.Tk.resizable(self, width=False, height=False)  # Can't adjust window size
+        tk.Tk.minsize(self, self.width * 2 // 3, self.height * 2 // 3)
 
         container = tk.Frame(self)
         container.pack(side="top", fill="both", expand=True)
@@ -61,6 +85,106 @@ class WinMain(tk.Tk):
         frame.tkraise()
 
 
+class ChartSlot:
+    """
+    One chart position on the MainPage canvas. The Figure, its FigureCanvasTkAgg and the canvas
+    window are created once and reused: bars, labels and ticks are updated in place, and when only
+    the bar heights change the bars are blitted over a cached background instead of redrawing
+    the whole figure.
+    """
+
+    def __init__(self, parent, place, x, y):
+
+        self.figure = Figure(figsize=(5, 3), dpi=100)
+        self.graph = self.figure.add_subplot(1, 1, 1)
+        self.size = (500, 300)
+
+        self.figure_canvas = tk.Canvas(parent, width=200, height=200)
+        place(x, y, anchor=tk.NW, window=self.figure_canvas)
+
+        self.fig_canvas = FigureCanvasTkAgg(self.figure, master=self.figure_canvas)
+        self.fig_canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        self.fig_canvas.mpl_connect("draw_event", self.on_draw)
+
+        self.bars = []
+        self.texts = []
+        self.layout = None
+        self.background = None
+
+    def on_draw(self, event):
+
+        # Bars and their labels are animated artists, so a full draw leaves them out of the background
+        self.background = self.fig_canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_bars()
+
+    def resize(self, scale):
+
+        # The FigureCanvasTkAgg widget resizes and redraws the figure when its own size changes
+        width, height = (int(size * scale) for size in self.size)
+        self.fig_canvas.get_tk_widget().configure(width=width, height=height)
+
+    def draw_bars(self):
+
+        for artist in self.bars + self.texts:
+            self.graph.draw_artist(artist)
+
+    def rebuild(self, values, xlabel, title, bar_text_size, xtick_text_size):
+
+        for artist in self.bars + self.texts:
+            artist.remove()
+
+        x_axis = [i for i in range(len(values))]
+
+        # Restart the colour cycle so rebuilt bars keep the colour of a fresh figure
+        self.graph.set_prop_cycle(None)
+        self.bars = list(self.graph.bar(x=x_axis, height=[0] * len(x_axis), animated=True))
+        self.texts = [
+            self.graph.text(
+                rect.get_x() + rect.get_width() / 2,
+                0,
+                "",
+                ha="center",
+                va="bottom",
+                size=bar_text_size,
+                animated=True,
+            )
+            for rect in self.bars
+        ]
+
+        self.graph.set_xlabel(xlabel)
+        self.graph.set_ylabel("Probability (%)")
+        self.graph.set_xticks(x_axis)
+        self.graph.set_xticklabels(labels=values, size=xtick_text_size)
+        self.graph.set_title(title, y=1.08, size=12)
+        self.graph.set_xlim(-0.5, len(x_axis) - 0.5)
+        self.graph.set_ylim(0, 100)
+
+    def update(self, probs, values, xlabel, title, text_sizes, rounder):
+
+        # Axes, ticks or title changed: rebuild the bars and redraw the figure once
+        redraw = (tuple(values), xlabel, title) != self.layout or self.background is None
+
+        if redraw:
+            self.rebuild(values, xlabel, title, *text_sizes)
+            self.layout = (tuple(values), xlabel, title)
+
+        for rect, text, prob in zip(self.bars, self.texts, probs):
+            rect.set_height(prob)
+            text.set_y(prob)
+            text.set_text(str(rounder(prob)))
+
+        if redraw:
+            self.fig_canvas.draw()
+        else:
+            self.fig_canvas.restore_region(self.background)
+            self.draw_bars()
+            self.fig_canvas.blit(self.figure.bbox)
+
+    def destroy(self):
+
+        self.figure_canvas.destroy()
+
+
 class MainPage(tk.Frame):
 
     def __init__(self, parent, controller):
@@ -72,19 +196,23 @@ class MainPage(tk.Frame):
         self.centerY = int(controller.height / 2)
         self.quarterY = int(controller.height / 4)
         self.canvas = tk.Canvas(self, width=controller.width, height=controller.height)
-        self.canvas.pack()
-
-        # Background Images
-        self.woodland_image = ImageTk.PhotoImage(
-            Image.open("Images/Woodland.jpg").resize(
-                (controller.width, controller.height)
-            )
-        )
-        self.dark_image = ImageTk.PhotoImage(
-            Image.open("Images/DarkTheme.jpg").resize(
-                (controller.width, controller.height)
-            )
-        )
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        # Resizable Layout: widgets are placed in design coordinates (the default window
+        # size) and moved once a resize settles
+        self.design_width = controller.width
+        self.design_height = controller.height
+        self.canvas_width = controller.width
+        self.canvas_height = controller.height
+        self.scale_x = 1
+        self.scale_y = 1
+        self.window_items = {}
+        self.resize_job = None
+        self.canvas.bind("<Configure>", self.on_resize)
+
+        # Background Images (one canvas item, pointed at the current theme and size)
+        self.background_images = {}
+        self.background_item = None
 
         # Menubar
         self.theme_init = 0
@@ -125,33 +253,50 @@ class MainPage(tk.Frame):
         self.attack_pool = 0
         self.defense_pool = 0
 
+        # Probability Engines run on a background worker (distributions are shared through the dicepool cache).
+        # The worker owns the pools; the Tk thread only uses their stateless helpers
+        self.worker = ComputeWorker()
+        self.atk_dicepool = self.worker.atk_pool
+        self.def_dicepool = self.worker.def_pool
+        self.pending_charts = set()
+        self.request_start = None
+        self.polling = False
+
+        # Persistent Figures, one per chart position
+        self.chart_slots = {}
+
+        # Redraw Scheduling: dirty charts and the inputs each chart was last painted with
+        self.dirty_charts = set()
+        self.painted_inputs = {}
+        self.redraw_job = None
+
         die_dims = (30, 30)
         die_cube_dims = (18, 18)
 
         # Store Dice Images
         for colour in self.atk_colours:
-            self.atk_dice_images[colour] = ImageTk.PhotoImage(
-                Image.open("Images/Descent" + colour + "Dice.png").resize(die_dims)
+            self.atk_dice_images[colour] = photo_image(
+                "Images/Descent" + colour + "Dice.png", die_dims
             )
             if colour == "Red":
-                self.dice_cube_images[colour] = ImageTk.PhotoImage(
-                    Image.open("Images/" + colour + "Cube.png").resize((18, 18))
+                self.dice_cube_images[colour] = photo_image(
+                    "Images/" + colour + "Cube.png", (18, 18)
                 )
             else:
-                self.dice_cube_images[colour] = ImageTk.PhotoImage(
-                    Image.open("Images/" + colour + "Cube.png").resize(die_cube_dims)
+                self.dice_cube_images[colour] = photo_image(
+                    "Images/" + colour + "Cube.png", die_cube_dims
                 )
         for colour in self.def_colours:
-            self.def_dice_images[colour] = ImageTk.PhotoImage(
-                Image.open("Images/Descent" + colour + "Dice.png").resize(die_dims)
+            self.def_dice_images[colour] = photo_image(
+                "Images/Descent" + colour + "Dice.png", die_dims
             )
             if colour == "Brown":
-                self.dice_cube_images[colour] = ImageTk.PhotoImage(
-                    Image.open("Images/" + colour + "Cube.png").resize((22, 22))
+                self.dice_cube_images[colour] = photo_image(
+                    "Images/" + colour + "Cube.png", (22, 22)
                 )
             else:
-                self.dice_cube_images[colour] = ImageTk.PhotoImage(
-                    Image.open("Images/" + colour + "Cube.png").resize(die_cube_dims)
+                self.dice_cube_images[colour] = photo_image(
+                    "Images/" + colour + "Cube.png", die_cube_dims
                 )
 
         # Die Locations
@@ -166,8 +311,8 @@ class MainPage(tk.Frame):
         self.def_sep = die_length + 20
 
         # Attack Dice Buttons
-        self.blue_dice = ImageTk.PhotoImage(
-            Image.open("Images/DescentBlueDice.png").resize((die_length, die_length))
+        self.blue_dice = photo_image(
+            "Images/DescentBlueDice.png", (die_length, die_length)
         )
         blue_dice_button = tk.Button(
             self,
@@ -175,12 +320,10 @@ class MainPage(tk.Frame):
             bg="blue",
             command=lambda: self.update_atk_dice("Blue", False),
         )
-        self.canvas.create_window(
-            self.atk_x, self.atk_y, anchor=tk.NW, window=blue_dice_button
-        )
+        self.place_window(self.atk_x, self.atk_y, anchor=tk.NW, window=blue_dice_button)
 
-        self.yellow_dice = ImageTk.PhotoImage(
-            Image.open("Images/DescentYellowDice.png").resize((die_length, die_length))
+        self.yellow_dice = photo_image(
+            "Images/DescentYellowDice.png", (die_length, die_length)
         )
         yellow_dice_button = tk.Button(
             self,
@@ -188,15 +331,15 @@ class MainPage(tk.Frame):
             bg="yellow",
             command=lambda: self.update_atk_dice("Yellow", False),
         )
-        self.canvas.create_window(
+        self.place_window(
             self.atk_x + self.atk_sep,
             self.atk_y,
             anchor=tk.NW,
             window=yellow_dice_button,
         )
 
-        self.red_dice = ImageTk.PhotoImage(
-            Image.open("Images/DescentRedDice.png").resize((die_length, die_length))
+        self.red_dice = photo_image(
+            "Images/DescentRedDice.png", (die_length, die_length)
         )
         red_dice_button = tk.Button(
             self,
@@ -204,15 +347,15 @@ class MainPage(tk.Frame):
             bg="red",
             command=lambda: self.update_atk_dice("Red", False),
         )
-        self.canvas.create_window(
+        self.place_window(
             self.atk_x + 2 * self.atk_sep,
             self.atk_y,
             anchor=tk.NW,
             window=red_dice_button,
         )
 
-        self.green_dice = ImageTk.PhotoImage(
-            Image.open("Images/DescentGreenDice.png").resize((die_length, die_length))
+        self.green_dice = photo_image(
+            "Images/DescentGreenDice.png", (die_length, die_length)
         )
         green_dice_button = tk.Button(
             self,
@@ -220,7 +363,7 @@ class MainPage(tk.Frame):
             bg="green",
             command=lambda: self.update_atk_dice("Green", False),
         )
-        self.canvas.create_window(
+        self.place_window(
             self.atk_x + 3 * self.atk_sep,
             self.atk_y,
             anchor=tk.NW,
@@ -228,8 +371,8 @@ class MainPage(tk.Frame):
         )
 
         # Defense Dice Buttons
-        self.black_dice = ImageTk.PhotoImage(
-            Image.open("Images/DescentBlackDice.png").resize((die_length, die_length))
+        self.black_dice = photo_image(
+            "Images/DescentBlackDice.png", (die_length, die_length)
         )
         black_dice_button = tk.Button(
             self,
@@ -237,12 +380,12 @@ class MainPage(tk.Frame):
             bg="black",
             command=lambda: self.update_def_dice("Black", False),
         )
-        self.canvas.create_window(
+        self.place_window(
             self.def_x, self.def_y, anchor=tk.NW, window=black_dice_button
         )
 
-        self.grey_dice = ImageTk.PhotoImage(
-            Image.open("Images/DescentGreyDice.png").resize((die_length, die_length))
+        self.grey_dice = photo_image(
+            "Images/DescentGreyDice.png", (die_length, die_length)
         )
         grey_dice_button = tk.Button(
             self,
@@ -250,12 +393,12 @@ class MainPage(tk.Frame):
             bg="grey",
             command=lambda: self.update_def_dice("Grey", False),
         )
-        self.canvas.create_window(
+        self.place_window(
             self.def_x + self.def_sep, self.def_y, anchor=tk.NW, window=grey_dice_button
         )
 
-        self.brown_dice = ImageTk.PhotoImage(
-            Image.open("Images/DescentBrownDice.png").resize((die_length, die_length))
+        self.brown_dice = photo_image(
+            "Images/DescentBrownDice.png", (die_length, die_length)
         )
         brown_dice_button = tk.Button(
             self,
@@ -263,7 +406,7 @@ class MainPage(tk.Frame):
             bg="brown",
             command=lambda: self.update_def_dice("Brown", False),
         )
-        self.canvas.create_window(
+        self.place_window(
             self.def_x + 2 * self.def_sep,
             self.def_y,
             anchor=tk.NW,
@@ -271,7 +414,7 @@ class MainPage(tk.Frame):
         )
 
         # Roll (Plotting) Button
-        self.roll_image = ImageTk.PhotoImage(Image.open("Images/Roll.png"))
+        self.roll_image = photo_image("Images/Roll.png")
         plot_button = tk.Button(
             self,
             image=self.roll_image,
@@ -279,10 +422,10 @@ class MainPage(tk.Frame):
             takefocus=False,
             command=self.draw_figures,
         )
-        self.canvas.create_window(110, 700, anchor=tk.NW, window=plot_button)
+        self.place_window(110, 700, anchor=tk.NW, window=plot_button)
 
         # Reset Pool Button
-        self.reset_image = ImageTk.PhotoImage(Image.open("Images/Reset.png"))
+        self.reset_image = photo_image("Images/Reset.png")
         self.reset_button = tk.Button(
             self,
             image=self.reset_image,
@@ -290,44 +433,47 @@ class MainPage(tk.Frame):
             takefocus=False,
             command=self.clear_pool,
         )
-        self.canvas.create_window(240, 700, anchor=tk.NW, window=self.reset_button)
+        self.place_window(240, 700, anchor=tk.NW, window=self.reset_button)
 
         # Radio Buttons for Atk Figure Types
         self.fig_order_atk = tk.StringVar()
 
-        self.greater_text = ImageTk.PhotoImage(Image.open("Images/Greater.png"))
+        self.greater_text = photo_image("Images/Greater.png")
         greater_check_atk = tk.Radiobutton(
             self,
             image=self.greater_text,
             bg="black",
             var=self.fig_order_atk,
             indicatoron=0,
+            command=lambda: self.redraw_shown("Attack", "Damage"),
             value="great",
         )
 
-        self.equal_text = ImageTk.PhotoImage(Image.open("Images/Equal.png"))
+        self.equal_text = photo_image("Images/Equal.png")
         equal_check_atk = tk.Radiobutton(
             self,
             image=self.equal_text,
             bg="black",
             var=self.fig_order_atk,
             indicatoron=0,
+            command=lambda: self.redraw_shown("Attack", "Damage"),
             value="exact",
         )
 
-        self.less_text = ImageTk.PhotoImage(Image.open("Images/Less.png"))
+        self.less_text = photo_image("Images/Less.png")
         lesser_check_atk = tk.Radiobutton(
             self,
             image=self.less_text,
             bg="black",
             var=self.fig_order_atk,
             indicatoron=0,
+            command=lambda: self.redraw_shown("Attack", "Damage"),
             value="less",
         )
 
-        self.canvas.create_window(100, 440, anchor=tk.NW, window=greater_check_atk)
-        self.canvas.create_window(100, 475, anchor=tk.NW, window=equal_check_atk)
-        self.canvas.create_window(100, 510, anchor=tk.NW, window=lesser_check_atk)
+        self.place_window(100, 440, anchor=tk.NW, window=greater_check_atk)
+        self.place_window(100, 475, anchor=tk.NW, window=equal_check_atk)
+        self.place_window(100, 510, anchor=tk.NW, window=lesser_check_atk)
 
         greater_check_atk.select()
 
@@ -340,6 +486,7 @@ class MainPage(tk.Frame):
             bg="black",
             var=self.fig_order_def,
             indicatoron=0,
+            command=lambda: self.redraw_shown("Defense"),
             value="great",
         )
 
@@ -349,6 +496,7 @@ class MainPage(tk.Frame):
             bg="black",
             var=self.fig_order_def,
             indicatoron=0,
+            command=lambda: self.redraw_shown("Defense"),
             value="exact",
         )
 
@@ -358,12 +506,13 @@ class MainPage(tk.Frame):
             bg="black",
             var=self.fig_order_def,
             indicatoron=0,
+            command=lambda: self.redraw_shown("Defense"),
             value="less",
         )
 
-        self.canvas.create_window(310, 440, anchor=tk.NW, window=greater_check_def)
-        self.canvas.create_window(310, 475, anchor=tk.NW, window=equal_check_def)
-        self.canvas.create_window(310, 510, anchor=tk.NW, window=lesser_check_def)
+        self.place_window(310, 440, anchor=tk.NW, window=greater_check_def)
+        self.place_window(310, 475, anchor=tk.NW, window=equal_check_def)
+        self.place_window(310, 510, anchor=tk.NW, window=lesser_check_def)
 
         greater_check_def.select()
 
@@ -371,24 +520,24 @@ class MainPage(tk.Frame):
         self.kind_button_mode = 0
 
         icon_size = 40
-        self.melee_icon = ImageTk.PhotoImage(
-            Image.open("Images/MeleeIcon40px.png").resize((icon_size, icon_size))
+        self.melee_icon = photo_image(
+            "Images/MeleeIcon40px.png", (icon_size, icon_size)
         )
-        self.range_icon = ImageTk.PhotoImage(
-            Image.open("Images/RangeIcon40px.png").resize((icon_size, icon_size))
+        self.range_icon = photo_image(
+            "Images/RangeIcon40px.png", (icon_size, icon_size)
         )
 
         self.kind_button = tk.Button(
             self, image=self.melee_icon, command=self.toggle_dmg_range, border=0
         )
-        self.canvas.create_window(360, 365, anchor=tk.NW, window=self.kind_button)
+        self.place_window(360, 365, anchor=tk.NW, window=self.kind_button)
 
         # Little Figure Dice Frames
         self.atk_die_frame = tk.LabelFrame(self, borderwidth=0)
-        self.canvas.create_window(950, 370, anchor=tk.NE, window=self.atk_die_frame)
+        self.place_window(950, 370, anchor=tk.NE, window=self.atk_die_frame)
 
         self.def_die_frame = tk.LabelFrame(self, borderwidth=0)
-        self.canvas.create_window(950, 690, anchor=tk.NE, window=self.def_die_frame)
+        self.place_window(950, 690, anchor=tk.NE, window=self.def_die_frame)
 
     def show_menubar(self, controller):
 
@@ -420,27 +569,144 @@ class MainPage(tk.Frame):
             label="Dice Breakdown", command=lambda: self.show_dice_breakdown(controller)
         )
 
+        self.toolstab = tk.Menu(self.menubar, tearoff=0)
+        self.menubar.add_cascade(label="Tools", menu=self.toolstab)
+        self.toolstab.add_command(
+            label="Simulate Attack Pool",
+            command=lambda: self.show_simulation(controller),
+        )
+        self.toolstab.add_separator()
+        self.overlay_var = tk.BooleanVar(value=False)
+        self.overlay_label = None
+        self.toolstab.add_checkbutton(
+            label="Timing Overlay",
+            var=self.overlay_var,
+            command=self.toggle_overlay,
+        )
+        self.toolstab.add_command(label="Save Timings...", command=self.save_timings)
+
         controller.config(menu=self.menubar)
 
+    def toggle_overlay(self):
+
+        if self.overlay_var.get():
+            self.overlay_label = tk.Label(
+                self, font=("Courier", 9), justify=tk.LEFT, bg="black", fg="white"
+            )
+            self.place_window(1490, 10, anchor=tk.NE, window=self.overlay_label)
+            self.refresh_overlay()
+        elif self.overlay_label is not None:
+            self.overlay_label.destroy()
+            self.overlay_label = None
+
+    def refresh_overlay(self):
+
+        if self.overlay_label is None:
+            return
+
+        lines = ["span         last    mean     max  (ms)"]
+        for name, entry in sorted(spans.summary().items()):
+            lines.append(
+                "%-11s %6.1f  %6.1f  %6.1f"
+                % (name, entry["last ms"], entry["mean ms"], entry["max ms"])
+            )
+
+        self.overlay_label.configure(text="\n".join(lines))
+        self.after(OVERLAY_INTERVAL, self.refresh_overlay)
+
+    def save_timings(self):
+
+        path = filedialog.asksaveasfilename(
+            title="Save Timings",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl")],
+        )
+
+        if path:
+            spans.dump(path)
+
     def toggle_theme(self):
 
         prev_theme = self.theme_mode
         current_theme = int(self.theme_var.get())
 
-        if self.theme_init == 1:
-            if prev_theme == current_theme:
-                pass
-            elif current_theme == 0:
-                self.canvas.create_image(0, 0, image=self.woodland_image, anchor=tk.NW)
-            else:
-                self.canvas.create_image(0, 0, image=self.dark_image, anchor=tk.NW)
+        if self.theme_init == 0 or prev_theme != current_theme:
+            self.show_background(current_theme)
+
+        self.theme_mode = current_theme
+
+    def background_image(self, theme):
+
+        # Rounded up to BACKGROUND_STEP, so the image always covers the canvas
+        width = -(-self.canvas_width // BACKGROUND_STEP) * BACKGROUND_STEP
+        height = -(-self.canvas_height // BACKGROUND_STEP) * BACKGROUND_STEP
+        key = (theme, width, height)
+
+        if key not in self.background_images:
+
+            # Only backgrounds of the current size are kept in memory
+            self.background_images = {
+                other: image
+                for other, image in self.background_images.items()
+                if other[1:] == key[1:]
+            }
+            self.background_images[key] = photo_image(
+                BACKGROUNDS[theme], (width, height), keep=False
+            )
+
+        return self.background_images[key]
+
+    def show_background(self, theme):
+
+        image = self.background_image(theme)
+
+        if self.background_item is None:
+            self.background_item = self.canvas.create_image(
+                0, 0, image=image, anchor=tk.NW
+            )
         else:
-            if current_theme == 0:
-                self.canvas.create_image(0, 0, image=self.woodland_image, anchor=tk.NW)
+            self.canvas.itemconfigure(self.background_item, image=image)
+
+    def place_window(self, x, y, **kwargs):
+
+        # Canvas windows are given in design coordinates and follow the window size
+        item = self.canvas.create_window(x * self.scale_x, y * self.scale_y, **kwargs)
+        self.window_items[item] = (x, y)
+
+        return item
+
+    def on_resize(self, event):
+
+        self.canvas_width = event.width
+        self.canvas_height = event.height
+
+        # Re-layout once the size stops changing, not on every <Configure> event
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+
+        self.resize_job = self.after(RESIZE_SETTLE, self.apply_layout)
+
+    def apply_layout(self):
+
+        self.resize_job = None
+        self.scale_x = self.canvas_width / self.design_width
+        self.scale_y = self.canvas_height / self.design_height
+
+        for item, (x, y) in list(self.window_items.items()):
+
+            # Items whose widget has been destroyed (e.g. a cleared dice pool) are dropped
+            if self.canvas.type(item) != "window" or not self.canvas.itemcget(
+                item, "window"
+            ):
+                self.canvas.delete(item)
+                del self.window_items[item]
             else:
-                self.canvas.create_image(0, 0, image=self.dark_image, anchor=tk.NW)
+                self.canvas.coords(item, x * self.scale_x, y * self.scale_y)
 
-        self.theme_mode = int(self.theme_var.get())
+        self.show_background(self.theme_mode)
+
+        for slot in self.chart_slots.values():
+            slot.resize(min(self.scale_x, self.scale_y))
 
     def show_dice_breakdown(self, controller):
 
@@ -453,30 +719,224 @@ class MainPage(tk.Frame):
 
         win.resizable(width=False, height=False)
 
-        self.dicebreakdown_image = ImageTk.PhotoImage(
-            Image.open("Images/DiceBreakdown.png")
-        )
+        self.dicebreakdown_image = photo_image("Images/DiceBreakdown.png")
         label = tk.Label(win, image=self.dicebreakdown_image)
         label.pack()
 
+    def show_simulation(self, controller):
+        """
+        Opens a window with Monte Carlo estimates for the current attack pool. Batches run on a
+        background thread (and process pool) and the window is refreshed with the running
+        estimates through after() polling until the simulation converges or the window closes.
+        """
+
+        if self.total_atk() == 0:
+            return 0
+
+        win = tk.Toplevel(controller)
+        win.title("Attack Pool Simulation")
+        win.resizable(width=False, height=False)
+
+        label = tk.Label(win, font=LARGE_FONT, justify=tk.LEFT, padx=10, pady=10)
+        label.pack()
+
+        sim_pool = AttackPool()
+        for colour in self.atk_colours:
+            sim_pool.atk_state[colour] = self.atk_state[colour][0]
+
+        partials = queue.Queue()
+        stop = threading.Event()
+
+        # Worker processes are spawned, not forked: this process already runs Tk and worker threads
+        def run():
+            for partial in simulate_iter(
+                sim_pool,
+                rolls=4000000,
+                stop=stop,
+                mp_context=multiprocessing.get_context("spawn"),
+            ):
+                partials.put(partial)
+            partials.put(None)
+
+        def close():
+            stop.set()
+            win.destroy()
+
+        def poll():
+
+            if stop.is_set():
+                return
+
+            latest = 0
+            finished = False
+
+            while not partials.empty():
+                partial = partials.get()
+                if partial is None:
+                    finished = True
+                else:
+                    latest = partial
+
+            if latest != 0:
+                lines = ["Rolls: " + str(latest["Rolls"])]
+
+                if sim_pool.atk_state["Blue"] != 0:
+                    p, lo, hi = latest["Miss"]
+                    lines.append(
+                        "Miss: %.2f%% (%.2f - %.2f)" % (p * 100, lo * 100, hi * 100)
+                    )
+
+                for hearts, (p, lo, hi) in enumerate(latest["Heart"]["great"]):
+                    lines.append(
+                        "At least %d Hearts: %.2f%% (%.2f - %.2f)"
+                        % (hearts, p * 100, lo * 100, hi * 100)
+                    )
+
+                label.configure(text="\n".join(lines))
+
+            if not finished and not stop.is_set():
+                win.after(100, poll)
+
+        win.protocol("WM_DELETE_WINDOW", close)
+        threading.Thread(target=run, daemon=True).start()
+        win.after(100, poll)
+
     def draw_figures(self):
 
-        if self.total_atk() != 0:
+        self.schedule_redraw("Attack", "Defense", "Damage")
 
-            if self.kind_button_mode == 0:
-                self.draw_atk_probs(kind="Heart", measure=self.fig_order_atk.get())
-                self.clear_atk_graph_dice()
-                self.draw_atk_graph_dice()
-            else:
-                self.draw_atk_probs(kind="Range", measure=self.fig_order_atk.get())
+    def schedule_redraw(self, *charts):
+        """
+        Marks the given charts as dirty. Everything marked within REDRAW_DELAY ms is
+        redrawn in one pass, and charts whose inputs have not changed are skipped.
+        """
+
+        self.dirty_charts.update(charts)
+
+        if self.redraw_job is None:
+            self.redraw_job = self.after(REDRAW_DELAY, self.flush_redraw)
+
+    def redraw_shown(self, *charts):
+
+        # Only charts already on screen follow the measure and kind toggles
+        self.schedule_redraw(*[chart for chart in charts if chart in self.chart_slots])
+
+    def flush_redraw(self):
+
+        self.redraw_job = None
+
+        charts = [
+            chart
+            for chart in self.dirty_charts
+            if self.chart_inputs(chart) != self.painted_inputs.get(chart)
+        ]
+        self.dirty_charts = set()
+
+        if charts:
+            self.request_charts(*charts)
+
+    def chart_inputs(self, chart):
+
+        # Everything a chart depends on, to tell whether a redraw would change it
+        atk_state = tuple(self.atk_state[colour][0] for colour in self.atk_colours)
+        def_state = tuple(self.def_state[colour][0] for colour in self.def_colours)
+
+        if chart == "Attack":
+            return (atk_state, self.fig_order_atk.get(), self.kind_button_mode)
+        elif chart == "Defense":
+            return (def_state, self.fig_order_def.get())
+        else:
+            return (atk_state, def_state, self.fig_order_atk.get())
+
+    def request_charts(self, *charts):
+        """
+        Asks the compute worker for the data of the given charts at the current dice counts. Charts of a
+        request that is superseded before it finishes are carried over to the newer request.
+        """
+
+        if not self.pending_charts:
+            self.request_start = spans.begin()
+
+        self.pending_charts.update(charts)
+
+        atk_state = {colour: self.atk_state[colour][0] for colour in self.atk_colours}
+        def_state = {colour: self.def_state[colour][0] for colour in self.def_colours}
+
+        # The inputs travel with the request, so a painted chart is recorded with the state it was computed for
+        inputs = {chart: self.chart_inputs(chart) for chart in self.pending_charts}
+        self.worker.submit(self.pending_charts, atk_state, def_state, inputs)
+
+        if not self.polling:
+            self.polling = True
+            self.after(POLL_INTERVAL, self.poll_worker)
+
+    def poll_worker(self):
+
+        try:
+            latest = self.worker.latest()
+        except Exception:
+            self.polling = False
+            self.pending_charts = set()
+            raise
+
+        if latest is None:
+            self.after(POLL_INTERVAL, self.poll_worker)
+            return
+
+        data, inputs = latest
+        self.polling = False
+        self.pending_charts = set()
+        self.paint_figures(data, inputs)
+
+        # Tk repaints the widgets from idle callbacks, so the paint span ends once Tk is idle
+        paint_start = spans.begin()
+        request_start = self.request_start
+        self.after_idle(
+            lambda: self.end_paint(paint_start, request_start, sorted(data))
+        )
+
+    def end_paint(self, paint_start, request_start, charts):
+
+        spans.end("paint", paint_start, charts=charts)
+        spans.end("interaction", request_start, charts=charts)
+
+    def paint_figures(self, data, inputs):
+
+        # Dice, measure and kind all come from the request's inputs (see chart_inputs), never from the
+        # toggles at paint time, so labels always match the data even if a toggle changed mid-computation
+        if self.total_atk() != 0 and "Attack" in data:
+
+            self.painted_inputs["Attack"] = inputs["Attack"]
+            atk_state, measure, kind_mode = inputs["Attack"]
+
+            kind = "Heart" if kind_mode == 0 else "Range"
+
+            with spans.span("render", chart="Attack"):
+                self.draw_atk_probs(data["Attack"], kind=kind, measure=measure)
+
+            with spans.span("widgets", chart="Attack"):
                 self.clear_atk_graph_dice()
-                self.draw_atk_graph_dice()
+                self.draw_atk_graph_dice(atk_state)
 
-        if self.total_def() != 0:
+        if self.total_def() != 0 and "Defense" in data:
+
+            self.painted_inputs["Defense"] = inputs["Defense"]
+            def_state, measure = inputs["Defense"]
 
-            self.draw_def_probs(measure=self.fig_order_def.get())
-            self.clear_def_graph_dice()
-            self.draw_def_graph_dice()
+            with spans.span("render", chart="Defense"):
+                self.draw_def_probs(data["Defense"], measure=measure)
+
+            with spans.span("widgets", chart="Defense"):
+                self.clear_def_graph_dice()
+                self.draw_def_graph_dice(def_state)
+
+        if self.total_atk() != 0 and "Damage" in data:
+
+            self.painted_inputs["Damage"] = inputs["Damage"]
+            atk_state, def_state, measure = inputs["Damage"]
+
+            with spans.span("render", chart="Damage"):
+                self.draw_dmg_probs(data["Damage"], measure=measure)
 
     def text_size(self, bars, kind):
         """
@@ -515,18 +975,34 @@ class MainPage(tk.Frame):
             else:
                 return 4
 
-    def draw_atk_probs(self, kind="Heart", measure="great"):
+    def chart_slot(self, name, x, y):
 
-        atk_pool = AttackPool()
+        # Chart slots are created on first use and then redrawn in place
+        if name not in self.chart_slots:
+            self.chart_slots[name] = ChartSlot(self.canvas, self.place_window, x, y)
 
-        for colour in self.atk_colours:
-            atk_pool.atk_state[colour] = self.atk_state[colour][0]
+            if (self.scale_x, self.scale_y) != (1, 1):
+                self.chart_slots[name].resize(min(self.scale_x, self.scale_y))
+
+        return self.chart_slots[name]
+
+    def remove_chart(self, name):
 
-        graph_fig = Figure(figsize=(5, 3), dpi=100)
-        graph = graph_fig.add_subplot(1, 1, 1)
+        # Takes a chart off the screen, e.g. the damage chart once the attack pool is empty
+        if name in self.chart_slots:
+            self.chart_slots.pop(name).destroy()
+
+        self.painted_inputs.pop(name, None)
+
+    def draw_atk_probs(self, data, kind="Heart", measure="great"):
+
+        atk_pool = self.atk_dicepool
 
         probs = []
 
+        # Every bar of every measure comes from one pass over the distribution
+        curves = data["Curves"]
+
         if measure == "exact":
             str_kind = "exactly"
         elif measure == "great":
@@ -535,124 +1011,40 @@ class MainPage(tk.Frame):
             str_kind = "less than"
 
         if kind == "Heart":
-
-            maxh = atk_pool.max_heart()
-
-            # Construct Values and Include Misses (if necessary)
-            if atk_pool.atk_state["Blue"] != 0:
-                probs.append(atk_pool.event_select("Miss")["Prob"] * 100)
-
-                # Construct Values
-                x_axis = [i for i in range(maxh + 2)]
-                values = [i - 1 for i in range(maxh + 2)]
-                values[0] = "><"
-            else:
-                x_axis = [i for i in range(maxh + 1)]
-                values = [str(i) for i in range(maxh + 1)]
-
-            for val in range(maxh + 1):
-                probs.append(
-                    atk_pool.event_select(heart_val=val, heart_measure=measure)["Prob"]
-                    * 100
-                )
-
-            print(values)
-            print(probs)
-
-            bar = graph.bar(x=x_axis, height=probs)
-            bars = len(bar)
-            bar_text_size = self.text_size(bars, "bar_text")
-            xtick_text_size = self.text_size(bars, "xticks")
-
-            ind = 0
-
-            for rect in bar:
-                height = rect.get_height()
-                graph.text(
-                    rect.get_x() + rect.get_width() / 2,
-                    height,
-                    str(atk_pool.fraction_rounder(probs[ind])),
-                    ha="center",
-                    va="bottom",
-                    size=bar_text_size,
-                )
-                ind += 1
-
-            graph.set_xlabel("Hearts (x)")
-            graph.set_ylabel("Probability (%)")
-            graph.set_xticks(x_axis)
-            graph.set_xticklabels(labels=values, size=xtick_text_size)
-            graph.set_title(
-                "Probability of Rolling " + str_kind + " x Hearts", y=1.08, size=12
-            )
-            graph.set_ylim(0, 100)
-
+            maxv = data["Heart"]
+            xlabel = "Hearts (x)"
+            title = "Probability of Rolling " + str_kind + " x Hearts"
         else:
+            maxv = data["Range"]
+            xlabel = "Range (x)"
+            title = "Probability of Rolling " + str_kind + " x Range"
+
+        # Construct Values and Include Misses (if necessary)
+        if data["Blue"]:
+            probs.append(curves["Miss"] * 100)
+            values = [str(i - 1) for i in range(maxv + 2)]
+            values[0] = "><"
+        else:
+            values = [str(i) for i in range(maxv + 1)]
 
-            maxr = atk_pool.max_range()
-
-            if atk_pool.atk_state["Blue"] != 0:
-                probs.append(atk_pool.event_select(heart_val="Miss")["Prob"] * 100)
-
-                # Construct Values
-                x_axis = [i for i in range(maxr + 2)]
-                values = [i - 1 for i in range(maxr + 2)]
-                values[0] = "><"
-            else:
-                x_axis = [i for i in range(maxr + 1)]
-                values = [str(i) for i in range(maxr + 1)]
-
-            for val in range(maxr + 1):
-                probs.append(
-                    atk_pool.event_select(range_val=val, range_measure=measure)["Prob"]
-                    * 100
-                )
+        probs.extend(prob * 100 for prob in curves[kind][measure])
 
-            print(values)
-            print(probs)
-
-            bar = graph.bar(x=x_axis, height=probs)
-            bars = len(bar)
-            bar_text_size = self.text_size(bars, "bar_text")
-            xtick_text_size = self.text_size(bars, "xticks")
-
-            ind = 0
-
-            for rect in bar:
-                height = rect.get_height()
-                graph.text(
-                    rect.get_x() + rect.get_width() / 2,
-                    height,
-                    str(atk_pool.fraction_rounder(probs[ind])),
-                    ha="center",
-                    va="bottom",
-                    size=bar_text_size,
-                )
-                ind += 1
-
-            graph.set_xlabel("Range (x)")
-            graph.set_ylabel("Probability (%)")
-            graph.set_xticks(x_axis)
-            graph.set_xticklabels(labels=values, size=xtick_text_size)
-            graph.set_title(
-                "Probability of Rolling " + str_kind + " x Range", y=1.08, size=12
-            )
-            graph.set_ylim(0, 100)
+        log_event("atk chart", kind=kind, measure=measure, values=values, probs=probs)
 
-        figure_canvas = tk.Canvas(self.canvas, width=200, height=200)
-        self.canvas.create_window(460, 100, anchor=tk.NW, window=figure_canvas)
+        bars = len(probs)
+        text_sizes = (self.text_size(bars, "bar_text"), self.text_size(bars, "xticks"))
 
-        fig_canvas = FigureCanvasTkAgg(graph_fig, master=figure_canvas)
-        fig_canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-        fig_canvas.draw()
+        self.chart_slot("Attack", 460, 100).update(
+            probs, values, xlabel, title, text_sizes, atk_pool.fraction_rounder
+        )
 
-    def draw_atk_graph_dice(self):
+    def draw_atk_graph_dice(self, atk_state):
 
         counter = 0
 
-        for colour in self.atk_colours:
+        for colour, num_dice in zip(self.atk_colours, atk_state):
 
-            for die in range(self.atk_state[colour][0]):
+            for die in range(num_dice):
 
                 atk_die_label = tk.Label(
                     self.atk_die_frame, image=self.dice_cube_images[colour]
@@ -665,15 +1057,9 @@ class MainPage(tk.Frame):
         for die in self.atk_die_frame.winfo_children():
             die.destroy()
 
-    def draw_def_probs(self, measure="great"):
-
-        def_pool = DefensePool()
+    def draw_def_probs(self, data, measure="great"):
 
-        for colour in self.def_colours:
-            def_pool.def_state[colour] = self.def_state[colour][0]
-
-        graph_fig = Figure(figsize=(5, 3), dpi=100)
-        graph = graph_fig.add_subplot(1, 1, 1)
+        def_pool = self.def_dicepool
 
         probs = []
 
@@ -684,63 +1070,66 @@ class MainPage(tk.Frame):
         else:
             str_kind = "less than"
 
-        maxs = def_pool.max_shield()
+        maxs = data["Shield"]
 
         # Construct Values
-        x_axis = [i for i in range(maxs + 1)]
         values = [str(i) for i in range(maxs + 1)]
 
-        for val in range(maxs + 1):
-            probs.append(
-                def_pool.event_select(shield_val=val, shield_measure=measure)["Prob"]
-                * 100
-            )
+        probs.extend(prob * 100 for prob in data["Curves"]["Shield"][measure])
 
-        print(values)
-        print(probs)
+        log_event("def chart", measure=measure, values=values, probs=probs)
 
-        bar = graph.bar(x=x_axis, height=probs)
-        bars = len(bar)
-        bar_text_size = self.text_size(bars, "bar_text")
-        xtick_text_size = self.text_size(bars, "xticks")
+        bars = len(probs)
+        text_sizes = (self.text_size(bars, "bar_text"), self.text_size(bars, "xticks"))
 
-        ind = 0
+        self.chart_slot("Defense", 460, 420).update(
+            probs,
+            values,
+            "Shields (x)",
+            "Probability of Rolling " + str_kind + " x Shield",
+            text_sizes,
+            def_pool.fraction_rounder,
+        )
 
-        for rect in bar:
-            height = rect.get_height()
-            graph.text(
-                rect.get_x() + rect.get_width() / 2,
-                height,
-                str(def_pool.fraction_rounder(probs[ind])),
-                ha="center",
-                va="bottom",
-                size=bar_text_size,
-            )
-            ind += 1
+    def draw_dmg_probs(self, data, measure="great"):
+        """
+        Draws the net damage (hearts minus shields, misses deal nothing) of the attack pool
+        against the defense pool. Cheap enough to be redrawn on every die click.
+        """
 
-        graph.set_xlabel("Shields (x)")
-        graph.set_ylabel("Probability (%)")
-        graph.set_xticks(x_axis)
-        graph.set_xticklabels(labels=values, size=xtick_text_size)
-        graph.set_title(
-            "Probability of Rolling " + str_kind + " x Shield", y=1.08, size=12
-        )
-        graph.set_ylim(0, 100)
+        atk_pool = self.atk_dicepool
 
-        figure_canvas = tk.Canvas(self.canvas, width=200, height=200)
-        self.canvas.create_window(460, 420, anchor=tk.NW, window=figure_canvas)
+        if measure == "exact":
+            str_kind = "exactly"
+        elif measure == "great":
+            str_kind = "at least"
+        else:
+            str_kind = "less than"
+
+        probs = [prob * 100 for prob in data["Damage"][measure]]
 
-        fig_canvas = FigureCanvasTkAgg(graph_fig, master=figure_canvas)
-        fig_canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-        fig_canvas.draw()
+        # Construct Values
+        values = [str(i) for i in range(len(probs))]
+
+        bars = len(probs)
+        text_sizes = (self.text_size(bars, "bar_text"), self.text_size(bars, "xticks"))
+
+        self.chart_slot("Damage", 980, 260).update(
+            probs,
+            values,
+            "Damage (x)",
+            "Probability of Dealing " + str_kind + " x Damage",
+            text_sizes,
+            atk_pool.fraction_rounder,
+        )
 
-    def draw_def_graph_dice(self):
+    def draw_def_graph_dice(self, def_state):
 
         counter = 0
 
-        for colour in self.def_colours:
+        for colour, num_dice in zip(self.def_colours, def_state):
 
-            for die in range(self.def_state[colour][0]):
+            for die in range(num_dice):
 
                 def_die_label = tk.Label(
                     self.def_die_frame, image=self.dice_cube_images[colour]
@@ -758,22 +1147,22 @@ class MainPage(tk.Frame):
         if self.kind_button_mode == 0:
             self.kind_button.configure(image=self.range_icon)
             self.kind_button_mode = 1
-            self.draw_figures()
         else:
             self.kind_button.configure(image=self.melee_icon)
             self.kind_button_mode = 0
-            self.draw_figures()
+
+        self.redraw_shown("Attack")
 
     def update_atk_dice(self, colour, delete):
 
         if delete:
-            print("\n" + colour + "\n")
             self.atk_state[colour][0] -= 1
-            print(self.total_atk())
+            log_event("atk die removed", colour=colour, total=self.total_atk())
 
             if self.total_atk() == 0:
                 self.clear_atk_pool()
                 self.attack_pool.destroy()
+                self.remove_chart("Damage")
                 return 0
         else:
 
@@ -781,21 +1170,24 @@ class MainPage(tk.Frame):
                 return 0
             else:
                 self.atk_state[colour][0] += 1
+                log_event("atk die added", colour=colour, total=self.total_atk())
 
                 if self.total_atk() == 1:
                     self.create_atk_pool()
                 else:
                     pass
 
-        self.clear_atk_pool()
-        self.create_atk_buttons()
-        self.display_atk_pool()
-        self.draw_atk_dice()
+        with spans.span("widgets", pool="Attack"):
+            self.clear_atk_pool()
+            self.create_atk_buttons()
+            self.display_atk_pool()
+            self.draw_atk_dice()
+        self.schedule_redraw("Damage")
 
     def create_atk_pool(self):
 
         self.attack_pool = tk.LabelFrame(self)
-        self.canvas.create_window(95, 590, anchor=tk.NW, window=self.attack_pool)
+        self.place_window(95, 590, anchor=tk.NW, window=self.attack_pool)
 
     def create_atk_buttons(self):
 
@@ -816,25 +1208,24 @@ class MainPage(tk.Frame):
                     )
                 )
 
-            print(colour + ":" + str(self.atk_state[colour][1]))
+            log_event(
+                "atk buttons", colour=colour, count=len(self.atk_state[colour][1])
+            )
 
     def draw_atk_dice(self):
 
         counter = 0
-        print("\n")
 
         for colour in self.atk_colours:
 
             num_dice = self.atk_state[colour][0]
-            print(colour + ":" + str(num_dice))
+            log_event("atk dice", colour=colour, count=num_dice)
 
             for dice in range(num_dice):
 
                 self.atk_state[colour][1][dice].grid(row=0, column=counter)
                 counter += 1
 
-        print("\n")
-
     def clear_atk_pool(self):
 
         for colour in self.atk_colours:
@@ -847,13 +1238,16 @@ class MainPage(tk.Frame):
     def update_def_dice(self, colour, delete):
 
         if delete:
-            print("\n" + colour + "\n")
             self.def_state[colour][0] -= 1
-            print(self.total_def())
+            log_event("def die removed", colour=colour, total=self.total_def())
 
             if self.total_def() == 0:
                 self.clear_def_pool()
                 self.defense_pool.destroy()
+
+                # The attack is now against an empty defense pool
+                if self.total_atk() != 0:
+                    self.schedule_redraw("Damage")
                 return 0
         else:
 
@@ -862,21 +1256,26 @@ class MainPage(tk.Frame):
                 return 0
             else:
                 self.def_state[colour][0] += 1
+                log_event("def die added", colour=colour, total=self.total_def())
 
                 if self.total_def() == 1:
                     self.create_def_pool()
                 else:
                     pass
 
-        self.clear_def_pool()
-        self.create_def_buttons()
-        self.display_def_pool()
-        self.draw_def_dice()
+        with spans.span("widgets", pool="Defense"):
+            self.clear_def_pool()
+            self.create_def_buttons()
+            self.display_def_pool()
+            self.draw_def_dice()
+
+        if self.total_atk() != 0:
+            self.schedule_redraw("Damage")
 
     def create_def_pool(self):
 
         self.defense_pool = tk.LabelFrame(self)
-        self.canvas.create_window(95, 635, anchor=tk.NW, window=self.defense_pool)
+        self.place_window(95, 635, anchor=tk.NW, window=self.defense_pool)
 
     def create_def_buttons(self):
 
@@ -895,25 +1294,24 @@ class MainPage(tk.Frame):
                     )
                 )
 
-            print(colour + ":" + str(self.def_state[colour][1]))
+            log_event(
+                "def buttons", colour=colour, count=len(self.def_state[colour][1])
+            )
 
     def draw_def_dice(self):
 
         counter = 0
-        print("\n")
 
         for colour in self.def_colours:
 
             num_dice = self.def_state[colour][0]
-            print(colour + ":" + str(num_dice))
+            log_event("def dice", colour=colour, count=num_dice)
 
             for dice in range(num_dice):
 
                 self.def_state[colour][1][dice].grid(row=0, column=counter)
                 counter += 1
 
-        print("\n")
-
     def clear_def_pool(self):
 
         for colour in self.def_colours:
@@ -961,14 +1359,19 @@ class MainPage(tk.Frame):
 
             self.defense_pool.destroy()
 
+        self.remove_chart("Damage")
+
     def display_atk_pool(self):
 
-        print(self.attack_pool.winfo_children())
+        log_event("atk pool", widgets=len(self.attack_pool.winfo_children()))
 
     def display_def_pool(self):
 
-        print(self.defense_pool.winfo_children())
+        log_event("def pool", widgets=len(self.defense_pool.winfo_children()))
 
 
-root = WinMain()
-root.mainloop()
+# Guarded so worker processes (simulation, batch jobs) can import this module safely
+if __name__ == "__main__":
+    configure_logging()
+    root = WinMain()
+    root.mainloop()
@@ -0,0 +1,175 @@
+"""
+Monte Carlo estimates for attack and defense pools.
+
+Rules such as rerolls, conditional abilities and chained effects are awkward to convolve exactly, so this module
+samples whole pools instead: every batch draws all dice of millions of rolls as NumPy arrays, an optional transform
+rewrites the faces (e.g. rerolls), and the totals are counted. Batches run on a process pool, each with its own
+SeedSequence child stream, so a given seed always gives the same final estimate however the batches are scheduled.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import sqrt
+import numpy as np
+
+from dicepool import cumulate
+
+# z value of the reported confidence intervals (95%)
+CONFIDENCE_Z = 1.96
+
+
+def compile_dice(pool):
+    """
+    Sampling tables for every die in the pool, one entry per colour present:
+    (values: faces x symbols int array, miss: per-face bool array, weights: per-face probabilities, count).
+    """
+
+    dice = []
+
+    for colour, num_dice in pool.composition():
+
+        # The pool's own array form of the die (see dicepool.compile_die)
+        values, miss, weights, denominator = pool.compiled(colour)
+        dice.append((values.astype(np.int16), miss, weights/denominator, num_dice))
+
+    return dice
+
+def reroll_misses(values, miss, faces, rng):
+    """
+    Example transform: every die that rolled a miss is rolled once more.
+    Transforms take and return the per-die (values, miss) arrays of a batch; faces holds each die's sampling table.
+    """
+
+    for die, (die_values, die_miss, weights) in enumerate(faces):
+
+        rows = np.nonzero(miss[:, die])[0]
+
+        if len(rows):
+            redraw = rng.choice(len(weights), size = len(rows), p = weights)
+            values[rows, die] = die_values[redraw]
+            miss[rows, die] = die_miss[redraw]
+
+    return values, miss
+
+def sample_batch(dice, rolls, seed, transform = None):
+
+    # Draws one batch of rolls and returns (miss count, histogram per symbol)
+    rng = np.random.default_rng(seed)
+    values = []
+    miss = []
+    faces = []
+
+    for die_values, die_miss, weights, count in dice:
+
+        index = rng.choice(len(weights), size = (rolls, count), p = weights)
+        values.append(die_values[index])
+        miss.append(die_miss[index])
+        faces.extend([(die_values, die_miss, weights)]*count)
+
+    values = np.concatenate(values, axis = 1)
+    miss = np.concatenate(miss, axis = 1)
+
+    if transform is not None:
+        values, miss = transform(values, miss, faces, rng)
+
+    totals = values.sum(axis = 1)
+    missed = miss.any(axis = 1)
+    hits = totals[~missed]
+
+    return int(missed.sum()), [np.bincount(hits[:, key], minlength = 1) for key in range(hits.shape[1])]
+
+def wilson(successes, trials):
+
+    # Wilson score interval: (estimate, lower, upper), well behaved even for probabilities near 0 or 1
+    if trials == 0:
+        return (0.0, 0.0, 1.0)
+
+    p = successes/trials
+    z2 = CONFIDENCE_Z**2
+    centre = (p + z2/(2*trials))/(1 + z2/trials)
+    half = CONFIDENCE_Z*sqrt(p*(1 - p)/trials + z2/(4*trials**2))/(1 + z2/trials)
+
+    return (p, max(0.0, centre - half), min(1.0, centre + half))
+
+def estimates(pool, rolls, missed, histograms):
+    """
+    Turns raw counts into the same shape as the pools' curves(), with (estimate, lower, upper) tuples
+    in place of exact probabilities.
+    """
+
+    result = {'Rolls': rolls, 'Miss': wilson(missed, rolls)}
+
+    for key, histogram in zip(pool.event_keys, histograms):
+        curves = cumulate(histogram.tolist())
+        result[key] = {measure: [wilson(count, rolls) for count in curve] for measure, curve in curves.items()}
+
+    return result
+
+def add_histograms(total, histograms):
+
+    if total is None:
+        return [histogram.copy() for histogram in histograms]
+
+    merged = []
+    for running, histogram in zip(total, histograms):
+        size = max(len(running), len(histogram))
+        merged.append(np.pad(running, (0, size - len(running))) + np.pad(histogram, (0, size - len(histogram))))
+
+    return merged
+
+def simulate_iter(pool, rolls = 1000000, batch = 250000, workers = None, seed = 0, transform = None, stop = None, mp_context = None):
+    """
+    Simulates the pool and yields running estimates (see estimates()) after every finished batch, so callers such
+    as the GUI can show partial results while the simulation converges. The last value yielded covers every roll.
+    transform must be a module-level function when workers > 1, since it is sent to other processes.
+    stop (e.g. a threading.Event) ends the simulation early once set: batches not yet started are cancelled.
+    mp_context picks how worker processes start; callers with threads of their own (the GUI) should pass a 'spawn'
+    context, since forking a multi-threaded process can deadlock the child.
+    """
+
+    dice = compile_dice(pool)
+    sizes = [batch]*(rolls//batch) + ([rolls % batch] if rolls % batch else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    done = 0
+    missed = 0
+    histograms = None
+
+    if workers == 1:
+        results = (sample_batch(dice, size, child, transform) + (size,) for size, child in zip(sizes, seeds))
+
+        for batch_missed, batch_histograms, size in results:
+            if stop is not None and stop.is_set():
+                return
+            done += size
+            missed += batch_missed
+            histograms = add_histograms(histograms, batch_histograms)
+            yield estimates(pool, done, missed, histograms)
+
+        return
+
+    executor = ProcessPoolExecutor(max_workers = workers, mp_context = mp_context)
+
+    # Stopping, an error or closing the generator cancels every batch still queued instead of waiting for it
+    try:
+        futures = {executor.submit(sample_batch, dice, size, child, transform): size for size, child in zip(sizes, seeds)}
+
+        for future in as_completed(futures):
+            if stop is not None and stop.is_set():
+                return
+            batch_missed, batch_histograms = future.result()
+            done += futures[future]
+            missed += batch_missed
+            histograms = add_histograms(histograms, batch_histograms)
+            yield estimates(pool, done, missed, histograms)
+    finally:
+        executor.shutdown(cancel_futures = True)
+
+def simulate(pool, rolls = 1000000, batch = 250000, workers = None, seed = 0, transform = None, mp_context = None):
+
+    # Runs the whole simulation and returns the final estimates
+    result = None
+
+    for result in simulate_iter(pool, rolls, batch, workers, seed, transform, mp_context = mp_context):
+        pass
+
+    return result
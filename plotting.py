@@ -0,0 +1,100 @@
+"""
+Matplotlib plotting helpers for the dice pools.
+
+Kept out of dicepool.py so the probability engine imports without matplotlib; AttackPool.atk_plot() loads this
+module on first use.
+"""
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+
+from instrument import log_event
+
+mpl.style.use('ggplot')
+
+
+def atk_plot(atk_pool, kind = 'Heart', measure = 'great'):
+ 
+    probs = []
+    
+    if measure == 'exact':
+            str_kind = 'exactly'
+    elif measure == 'great':
+        str_kind = 'at least'
+    else:
+        str_kind = 'less than'
+            
+    if kind == 'Heart':
+        
+        maxh = atk_pool.max_heart()
+
+        curves = atk_pool.curves()
+
+        # Construct Values and Include Misses (if necessary)
+        if atk_pool.atk_state['Blue'] != 0:
+            probs.append(curves['Miss']*100)
+            
+            # Construct Values
+            x_axis = [i for i in range(maxh+2)]
+            values = [i-1 for i in range(maxh+2)]
+            values[0] = 'Miss'
+        else:
+            x_axis = [i for i in range(maxh+1)]
+            values= [str(i) for i in range(maxh+1)]
+            
+        probs.extend(prob*100 for prob in curves['Heart'][measure])
+        
+        log_event('atk plot', values = values, probs = probs)
+        
+        bar = plt.bar(x = x_axis, height = probs)
+        ind = 0
+        
+        for rect in bar:
+            height = rect.get_height()
+            plt.text(rect.get_x() + rect.get_width()/2, height, str(atk_pool.fraction_rounder(probs[ind])) + "%", 
+                     ha = 'center', va = 'bottom', size = 8)
+            ind+=1
+        
+        plt.xlabel('Hearts')
+        plt.ylabel('Probability (%)')
+        plt.xticks(x_axis, values)    
+        plt.title('Probability of Rolling ' + str_kind + ' X Hearts', y = 1.08)
+        plt.ylim(0,100)
+        plt.show()
+        
+    else:
+        
+        maxr = atk_pool.max_range()
+
+        curves = atk_pool.curves()
+
+        if atk_pool.atk_state['Blue'] != 0:
+            probs.append(curves['Miss']*100)
+            
+            # Construct Values
+            x_axis = [i for i in range(maxr+2)]
+            values = [i-1 for i in range(maxr+2)]
+            values[0] = 'Miss'
+        else:
+            x_axis = [i for i in range(maxr+1)]
+            values= [str(i) for i in range(maxr+1)]
+            
+        probs.extend(prob*100 for prob in curves['Range'][measure])
+        
+        log_event('atk plot', values = values, probs = probs)
+
+        bar = plt.bar(x = x_axis, height = probs)
+        ind = 0
+        
+        for rect in bar:
+            height = rect.get_height()
+            plt.text(rect.get_x() + rect.get_width()/2, height, str(atk_pool.fraction_rounder(probs[ind])) + "%", ha = 'center', va = 'bottom', 
+                     size = 8)
+            ind+=1
+        
+        plt.xlabel('Range')
+        plt.ylabel('Probability (%)')
+        plt.xticks(x_axis, values)
+        plt.title('Probability of Rolling ' + str_kind + ' X Range', y = 1.08)
+        plt.ylim(0,100)
+        plt.show()
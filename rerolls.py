@@ -0,0 +1,171 @@
+"""
+Exact distributions for pools with reroll abilities.
+
+- reroll_faces(): a die that rerolls certain faces once (e.g. "reroll any blue miss") is just a die with different
+  face probabilities, so it is rewritten and the pool convolves as usual.
+- reroll_roll(): up to N dice may be rerolled after seeing the roll, chosen to maximise P(symbol >= value). Rolls are
+  enumerated per colour as multisets of faces, and the chance of success for a given kept total and set of rerolled
+  colours is memoised, so the policy search stays interactive up to the 7-dice cap.
+"""
+
+import copy
+from fractions import Fraction
+from itertools import combinations, combinations_with_replacement, product
+from math import factorial, lcm
+
+from dicepool import distribution_cache
+
+
+def reroll_faces(pool, colour, should_reroll):
+    """
+    Returns a copy of the pool in which every die of the given colour is rolled again, once, whenever
+    should_reroll(face) is true for the face it shows.
+    """
+
+    pool = copy.deepcopy(pool)
+    faces = pool.dice[colour]
+    rerolled = sum((face['Prob'] for face in faces if should_reroll(face)), Fraction(0))
+
+    # Keep a face outright, or reach it through the reroll
+    pool.dice[colour] = [dict(face, Prob = face['Prob']*(0 if should_reroll(face) else 1) + rerolled*face['Prob']) for face in faces]
+    pool.digest = None
+
+    return pool
+
+def combine_events(event_a, event_b):
+
+    # Sum of two event keys; a miss on either side makes the whole roll a miss
+    if event_a[0] == 'Miss':
+        return event_a
+    if event_b[0] == 'Miss':
+        return event_b
+
+    return tuple(a + b for a, b in zip(event_a, event_b))
+
+def colour_outcomes(pool, colour, num_dice):
+
+    # Every multiset of faces num_dice dice of one colour can show, with its integer weight over denominator**num_dice
+    counts, denominator = pool.die_counts(colour)
+    events = list(counts)
+    outcomes = []
+
+    for faces in combinations_with_replacement(range(len(events)), num_dice):
+
+        weight = factorial(num_dice)
+        for face in set(faces):
+            weight = weight//factorial(faces.count(face))*counts[events[face]]**faces.count(face)
+
+        outcomes.append((tuple((colour, events[face]) for face in faces), weight))
+
+    return outcomes, denominator**num_dice
+
+def reroll_roll(pool, rerolls = 1, kind = 'Heart', value = 1):
+    """
+    Distribution of the pool when, after rolling, up to 'rerolls' dice are rolled again to maximise the chance
+    of at least 'value' of the symbol 'kind' (a blue miss always fails). Ties keep the fewest rerolls.
+    Returns bundles in the same form as the pool's roll(), with exact Fraction probabilities.
+    """
+
+    key = ('Reroll', rerolls, kind, value) + pool.pool_key()
+    bundles = distribution_cache.get(key)
+
+    if bundles is not None:
+        return bundles
+
+    symbol = pool.event_keys.index(kind)
+    zero = tuple(0 for key in pool.event_keys)
+    composition = pool.composition()
+
+    # Reroll pools are the pool's own class holding only the rerolled dice, so their counts come from the shared caches
+    sub_pool = copy.copy(pool)
+
+    def reroll_counts(colours):
+        sub_pool.state = {colour: colours.count(colour) for colour in pool.colours}
+        return sub_pool.counts()
+
+    scale_base = 1
+    for colour, num_dice in composition:
+        scale_base = lcm(scale_base, pool.die_counts(colour)[1])
+    full_scale = scale_base**rerolls
+
+    successes = {}
+
+    def success(kept, colours):
+
+        # Chance of success when 'kept' is the total of the dice kept and 'colours' are rolled again
+        if (kept, colours) not in successes:
+            counts, denominator = reroll_counts(colours)
+            hits = 0
+
+            for event, count in counts.items():
+                total = combine_events(kept, event)
+                if total[0] != 'Miss' and total[symbol] >= value:
+                    hits += count
+
+            successes[(kept, colours)] = Fraction(hits, denominator)
+
+        return successes[(kept, colours)]
+
+    per_colour = [colour_outcomes(pool, colour, num_dice) for colour, num_dice in composition]
+    denominator = 1
+    for outcomes, colour_denominator in per_colour:
+        denominator *= colour_denominator
+
+    totals = {}
+
+    for joint in product(*[outcomes for outcomes, colour_denominator in per_colour]):
+
+        dice = tuple(die for faces, weight in joint for die in faces)
+        weight = 1
+        for faces, colour_weight in joint:
+            weight *= colour_weight
+
+        # Totals of the whole roll, so the kept total of a candidate only needs the rerolled dice taken away
+        hit_total = zero
+        misses = 0
+        for colour, event in dice:
+            if event[0] == 'Miss':
+                misses += 1
+            else:
+                hit_total = combine_events(hit_total, event)
+
+        # Candidate policies: keep everything, or reroll any distinct choice of up to 'rerolls' dice
+        best_kept, best_colours, best_chance = None, (), None
+
+        candidates = {}
+        for size in range(min(rerolls, len(dice)) + 1):
+            for chosen in combinations(dice, size):
+                candidates.setdefault(chosen, None)
+
+        for chosen in candidates:
+
+            kept = hit_total
+            kept_misses = misses
+            for colour, event in chosen:
+                if event[0] == 'Miss':
+                    kept_misses -= 1
+                else:
+                    kept = tuple(a - b for a, b in zip(kept, event))
+
+            if kept_misses:
+                kept = ('Miss',)*len(zero)
+
+            colours = tuple(sorted(colour for colour, event in chosen))
+            chance = success(kept, colours)
+
+            if best_chance is None or chance > best_chance:
+                best_kept, best_colours, best_chance = kept, colours, chance
+
+        counts, reroll_denominator = reroll_counts(best_colours)
+        scale = weight*(full_scale//reroll_denominator)
+
+        for event, count in counts.items():
+            total = combine_events(best_kept, event)
+            totals[total] = totals.get(total, 0) + scale*count
+
+    denominator *= full_scale
+
+    bundles = [dict(zip(pool.event_keys, event), Prob = Fraction(count, denominator)) for event, count in totals.items()]
+    distribution_cache.put(key, bundles)
+
+    return bundles
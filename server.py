@@ -0,0 +1,285 @@
+"""
+Local HTTP/JSON query service over the dicepool engine.
+
+Every endpoint takes a pool spec as in batch.py, e.g. GET /distribution?pool=2+red+1+blue+vs+1+black+1+grey
+- /distribution?pool=...&measure=exact: Chart data of every symbol (see batch.compute()).
+- /threshold?pool=...&heart=2&range=3&surge=0&shield=1&measure=great: Probability of the attack reaching the given
+  hearts / range / surges and of the defense rolling the given shields. Per-symbol measures (heart_measure=exact, ...)
+  override measure.
+- /damage?pool=...&measure=great: Net damage of the attack against the defense.
+- /stats: Request counts, latencies and result cache metrics.
+
+Answers are kept in one LRU cache shared by every connection, identical requests in flight are computed once, and
+the computation itself runs on a process pool so the event loop only parses requests and writes answers. Specs with
+more than MAX_DICE dice on either side are refused with 400.
+
+Usage: python server.py [--host 127.0.0.1] [--port 8080] [--workers N] [--cache-size 1024] [--engine exact|numpy]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from batch import compute, parse_spec
+from dicepool import ENGINES, AttackPool, DefensePool, DistributionCache, net_damage
+
+MEASURES = ('exact', 'great', 'less')
+
+# Latencies kept per endpoint for the /stats percentiles
+LATENCY_WINDOW = 1000
+
+# Largest number of dice accepted on either side of a spec; bigger pools would tie up a worker process
+MAX_DICE = 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def threshold(atk_state, def_state, values, measures, engine):
+
+    # {'Attack': P(hearts, range, surges), 'Defense': P(shields)} for the sides present in the spec
+    result = {}
+
+    if sum(atk_state.values()):
+        atk_pool = AttackPool(engine)
+        atk_pool.atk_state.update(atk_state)
+        result['Attack'] = float(atk_pool.prob_select(values['Heart'], values['Range'], values['Surge'], measures['Heart'], measures['Range'], measures['Surge']))
+
+    if sum(def_state.values()):
+        def_pool = DefensePool(engine)
+        def_pool.def_state.update(def_state)
+        result['Defense'] = float(def_pool.prob_select(values['Shield'], measures['Shield']))
+
+    return result
+
+def damage(atk_state, def_state, measure, engine):
+
+    atk_pool = AttackPool(engine)
+    def_pool = DefensePool(engine)
+    atk_pool.atk_state.update(atk_state)
+    def_pool.def_state.update(def_state)
+
+    return {'Damage': [float(prob) for prob in net_damage(atk_pool, def_pool)['Damage'][measure]]}
+
+def query_value(query, name, default = None):
+
+    values = query.get(name)
+    return values[-1] if values else default
+
+def query_measure(query, name, default):
+
+    measure = query_value(query, name, default)
+
+    if measure not in MEASURES:
+        raise ValueError('Unknown measure: ' + str(measure))
+
+    return measure
+
+def query_int(query, name):
+
+    value = query_value(query, name, '0')
+
+    if not value.isdigit():
+        raise ValueError('Expected a whole number for ' + name + ', got: ' + value)
+
+    return int(value)
+
+class ServiceStats:
+
+    def __init__(self):
+        """
+        Per-endpoint request counters and a window of recent latencies (seconds).
+        """
+
+        self.started = time.monotonic()
+        self.requests = {}
+        self.errors = {}
+        self.latencies = {}
+
+    def record(self, endpoint, latency, error):
+
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + int(error)
+        self.latencies.setdefault(endpoint, deque(maxlen = LATENCY_WINDOW)).append(latency)
+
+    def info(self):
+
+        endpoints = {}
+
+        for endpoint, latencies in self.latencies.items():
+
+            ordered = sorted(latencies)
+            endpoints[endpoint] = {'Requests': self.requests[endpoint],
+                                   'Errors': self.errors[endpoint],
+                                   'Mean ms': 1000*sum(ordered)/len(ordered),
+                                   'P50 ms': 1000*ordered[len(ordered)//2],
+                                   'P95 ms': 1000*ordered[min(len(ordered) - 1, int(0.95*len(ordered)))],
+                                   'Max ms': 1000*ordered[-1]
+                                   }
+
+        return {'Uptime s': time.monotonic() - self.started, 'Endpoints': endpoints}
+
+class DiceService:
+
+    def __init__(self, workers = None, cache_size = 1024, engine = 'exact'):
+        """
+        - cache: Answers by normalised query, shared by every connection.
+        - pending: Futures of answers being computed, so identical concurrent queries wait on one computation.
+        """
+
+        self.engine = engine
+        self.executor = ProcessPoolExecutor(max_workers = workers)
+        self.cache = DistributionCache(cache_size)
+        self.pending = {}
+        self.stats = ServiceStats()
+
+    def job(self, endpoint, query):
+
+        # Returns (cache key, function, arguments) for a query, raising ValueError on bad input
+        pool = query_value(query, 'pool')
+
+        if pool is None:
+            raise ValueError('Missing pool spec, e.g. ?pool=2+red+1+blue+vs+1+black')
+
+        atk_state, def_state = parse_spec(pool)
+
+        for side, state in (('attack', atk_state), ('defense', def_state)):
+            if sum(state.values()) > MAX_DICE:
+                raise ValueError('At most ' + str(MAX_DICE) + ' ' + side + ' dice per pool, got ' + str(sum(state.values())))
+
+        pool_key = (tuple(sorted(atk_state.items())), tuple(sorted(def_state.items())))
+
+        if endpoint == '/distribution':
+            measure = query_measure(query, 'measure', 'exact')
+            return (endpoint, measure) + pool_key, compute, (atk_state, def_state, measure, self.engine)
+
+        elif endpoint == '/threshold':
+            measure = query_measure(query, 'measure', 'great')
+            values = {kind: query_int(query, kind.lower()) for kind in ('Heart', 'Range', 'Surge', 'Shield')}
+            measures = {kind: query_measure(query, kind.lower() + '_measure', measure) for kind in values}
+            key = (endpoint, tuple(sorted(values.items())), tuple(sorted(measures.items()))) + pool_key
+            return key, threshold, (atk_state, def_state, values, measures, self.engine)
+
+        else:
+            if not sum(atk_state.values()):
+                raise ValueError('Net damage needs an attack pool')
+
+            measure = query_measure(query, 'measure', 'great')
+            return (endpoint, measure) + pool_key, damage, (atk_state, def_state, measure, self.engine)
+
+    async def answer(self, endpoint, query):
+
+        key, function, args = self.job(endpoint, query)
+        result = self.cache.get(key)
+
+        if result is not None:
+            return result
+
+        if key not in self.pending:
+            loop = asyncio.get_running_loop()
+            self.pending[key] = loop.run_in_executor(self.executor, function, *args)
+
+        future = self.pending[key]
+
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if self.pending.get(key) is future and future.done():
+                del self.pending[key]
+
+        self.cache.put(key, result)
+
+        return result
+
+    async def respond(self, method, target):
+
+        # Returns (status, JSON-serialisable body)
+        url = urlsplit(target)
+
+        if url.path not in ('/distribution', '/threshold', '/damage', '/stats'):
+            return 404, {'error': 'Unknown endpoint: ' + url.path}
+
+        if method != 'GET':
+            return 405, {'error': 'Only GET is supported'}
+
+        if url.path == '/stats':
+            return 200, dict(self.stats.info(), Cache = self.cache.info(), Pending = len(self.pending))
+
+        try:
+            return 200, await self.answer(url.path, parse_qs(url.query))
+        except ValueError as error:
+            return 400, {'error': str(error)}
+
+    async def handle(self, reader, writer):
+
+        try:
+            request_line = await reader.readline()
+
+            # Headers are read and ignored; every response closes the connection
+            while (await reader.readline()).strip():
+                pass
+
+            start = time.perf_counter()
+
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                status, body = 400, {'error': 'Malformed request line'}
+                target = ''
+            else:
+                try:
+                    status, body = await self.respond(method, target)
+                except Exception as error:
+                    status, body = 500, {'error': repr(error)}
+
+            endpoint = urlsplit(target).path
+            if endpoint in ('/distribution', '/threshold', '/damage'):
+                self.stats.record(endpoint, time.perf_counter() - start, status != 200)
+
+            payload = json.dumps(body).encode()
+            writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: close\r\n\r\n' % (status, REASONS[status], len(payload))).encode() + payload)
+            await writer.drain()
+
+        except ConnectionError:
+            pass
+
+        finally:
+            writer.close()
+
+    async def serve(self, host = '127.0.0.1', port = 8080):
+
+        server = await asyncio.start_server(self.handle, host, port)
+
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+
+        self.executor.shutdown(cancel_futures = True)
+
+def main():
+
+    parser = argparse.ArgumentParser(description = 'Serve Diiscent dice odds over HTTP/JSON.')
+    parser.add_argument('--host', default = '127.0.0.1', help = 'Address to listen on')
+    parser.add_argument('--port', type = int, default = 8080, help = 'Port to listen on')
+    parser.add_argument('--workers', type = int, default = None, help = 'Number of worker processes')
+    parser.add_argument('--cache-size', type = int, default = 1024, help = 'Number of answers kept in the result cache')
+    parser.add_argument('--engine', choices = ENGINES, default = 'exact', help = 'Probability engine')
+    args = parser.parse_args()
+
+    service = DiceService(args.workers, args.cache_size, args.engine)
+    print('Serving on http://' + args.host + ':' + str(args.port))
+
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+from collections import namedtuple
+
+from dicepool import cumulate, distribution_cache
+
+# A surge ability: spend 'cost' surges for extra hearts, extra range and/or pierce (ignore that many shields).
+# As in the game, each ability can be used at most once per attack.
+SurgeAbility = namedtuple('SurgeAbility', ['cost', 'heart', 'range', 'pierce'], defaults = [0, 0, 0])
+
+
+def surge_frontiers(abilities, max_surge):
+    """
+    Dynamic programme over the surge count. Entry s lists the (heart, range, pierce) gains that can be bought with
+    at most s surges, keeping only allocations that no other allocation beats on every symbol.
+    """
+
+    frontiers = [{(0, 0, 0)} for surges in range(max_surge + 1)]
+
+    for ability in abilities:
+
+        # Budgets are walked downwards so every ability is bought at most once (0/1 knapsack)
+        for surges in range(max_surge, ability.cost - 1, -1):
+            bought = {(heart + ability.heart, rng + ability.range, pierce + ability.pierce) for heart, rng, pierce in frontiers[surges - ability.cost]}
+            frontiers[surges] = pareto(frontiers[surges] | bought)
+
+    return frontiers
+
+def pareto(gains):
+
+    return {gain for gain in gains if not any(other != gain and all(o >= g for o, g in zip(other, gain)) for other in gains)}
+
+def best_gain(frontier, rng, range_needed, objective, shields = 0, heart = 0):
+
+    # Lexicographic preference: reaching the required range first, then the objective, then the remaining symbols
+    def score(gain):
+        in_range = rng + gain[1] >= range_needed
+        if objective == 'Damage':
+            return (in_range, max(0, heart + gain[0] - max(0, shields - gain[2])), gain[1])
+        elif objective == 'Range':
+            return (in_range, gain[1], gain[0], gain[2])
+        else:
+            return (in_range, gain[0], gain[2], gain[1])
+
+    return max(sorted(frontier), key = score)
+
+def ability_key(abilities):
+
+    return tuple(sorted(SurgeAbility(*ability) for ability in abilities))
+
+def surge_roll(atk_pool, abilities, objective = 'Heart', range_needed = 0):
+    """
+    Distribution of an attack after spending its surges optimally on the given abilities.
+    Returns bundles of {'Heart', 'Range', 'Pierce', 'Prob'}. Blue misses, and rolls that cannot reach range_needed
+    even after spending surges, are reported as 'Miss' bundles.
+    """
+
+    if objective not in ('Heart', 'Range'):
+        raise ValueError('Unknown surge objective: ' + str(objective))
+
+    abilities = ability_key(abilities)
+    key = ('Surge', objective, range_needed, abilities) + atk_pool.pool_key()
+    bundles = distribution_cache.get(key)
+
+    if bundles is not None:
+        return bundles
+
+    frontiers = surge_frontiers(abilities, atk_pool.max_surge())
+
+    # The best spend only depends on the surge count and how much range is still missing
+    choices = {}
+    totals = {}
+
+    for bundle in atk_pool.roll():
+
+        if bundle['Heart'] == 'Miss':
+            event = ('Miss', 'Miss', 'Miss')
+        else:
+            deficit = max(0, range_needed - bundle['Range'])
+            choice = (bundle['Surge'], deficit)
+
+            if choice not in choices:
+                choices[choice] = best_gain(frontiers[bundle['Surge']], 0, deficit, objective)
+
+            heart, rng, pierce = choices[choice]
+
+            if bundle['Range'] + rng < range_needed:
+                event = ('Miss', 'Miss', 'Miss')
+            else:
+                event = (bundle['Heart'] + heart, bundle['Range'] + rng, pierce)
+
+        totals[event] = totals.get(event, 0) + bundle['Prob']
+
+    bundles = [{'Heart': event[0], 'Range': event[1], 'Pierce': event[2], 'Prob': prob} for event, prob in totals.items()]
+    distribution_cache.put(key, bundles)
+
+    return bundles
+
+def surge_curves(atk_pool, abilities, objective = 'Heart', range_needed = 0):
+    """
+    Chart form of surge_roll(): {'Miss': probability, 'Heart' / 'Range' / 'Pierce': {'exact', 'less', 'great'} lists}.
+    """
+
+    abilities = ability_key(abilities)
+    key = ('Surge curves', objective, range_needed, abilities) + atk_pool.pool_key()
+    curves = distribution_cache.get(key)
+
+    if curves is not None:
+        return curves
+
+    bundles = surge_roll(atk_pool, abilities, objective, range_needed)
+    hits = [bundle for bundle in bundles if bundle['Heart'] != 'Miss']
+
+    miss = 0
+    for bundle in bundles:
+        if bundle['Heart'] == 'Miss':
+            miss += bundle['Prob']
+
+    curves = {'Miss': miss}
+
+    for kind in ('Heart', 'Range', 'Pierce'):
+        pmf = [0]*(max([bundle[kind] for bundle in hits], default = 0) + 1)
+        for bundle in hits:
+            pmf[bundle[kind]] += bundle['Prob']
+        curves[kind] = cumulate(pmf)
+
+    distribution_cache.put(key, curves)
+
+    return curves
+
+def surge_damage(atk_pool, def_pool, abilities, range_needed = 0):
+    """
+    Net damage against a defense pool when surges are spent after both pools are rolled, picking the spend that
+    deals the most damage (hearts minus shields not ignored by pierce). Misses and out-of-range attacks deal nothing.
+    Returns {'Damage': {'exact', 'less', 'great'}} lists indexed by damage, like net_damage().
+    """
+
+    abilities = ability_key(abilities)
+    key = ('Surge damage', range_needed, abilities) + atk_pool.pool_key() + def_pool.pool_key()
+    curves = distribution_cache.get(key)
+
+    if curves is not None:
+        return curves
+
+    frontiers = surge_frontiers(abilities, atk_pool.max_surge())
+    shield_pmf = def_pool.curves()['Shield']['exact']
+    choices = {}
+    pmf = {}
+
+    for bundle in atk_pool.roll():
+
+        if bundle['Heart'] == 'Miss':
+            pmf[0] = pmf.get(0, 0) + bundle['Prob']
+            continue
+
+        deficit = max(0, range_needed - bundle['Range'])
+
+        for shields, shield_prob in enumerate(shield_pmf):
+
+            if not shield_prob:
+                continue
+
+            # Every distinct (surges, missing range, hearts, shields) situation is solved once
+            choice = (bundle['Surge'], deficit, bundle['Heart'], shields)
+
+            if choice not in choices:
+                heart, rng, pierce = best_gain(frontiers[bundle['Surge']], 0, deficit, 'Damage', shields, bundle['Heart'])
+
+                if rng < deficit:
+                    choices[choice] = 0
+                else:
+                    choices[choice] = max(0, bundle['Heart'] + heart - max(0, shields - pierce))
+
+            damage = choices[choice]
+            pmf[damage] = pmf.get(damage, 0) + bundle['Prob']*shield_prob
+
+    curves = {'Damage': cumulate([pmf.get(damage, 0) for damage in range(max(pmf) + 1)])}
+    distribution_cache.put(key, curves)
+
+    return curves
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dicepool
+from diskcache import disk_cache
+
+
+@pytest.fixture(autouse = True)
+def fresh_engine(monkeypatch):
+
+    # Every test computes from the dice themselves: no disk cache (and so no prebuilt lookup tables), an empty LRU
+    monkeypatch.setattr(disk_cache, 'enabled', False)
+    dicepool.distribution_cache.clear()
+
+    yield
+
+    dicepool.distribution_cache.clear()
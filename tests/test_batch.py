@@ -0,0 +1,67 @@
+import json
+import sys
+
+import pytest
+
+import batch
+from batch import compute, parse_side, parse_spec
+
+
+def failing_compute(atk_state, def_state, measure, engine):
+
+    # Module-level, so worker processes can unpickle it; fails for one spec only
+    if atk_state == {'Green': 1}:
+        raise ValueError('bad spec')
+
+    return compute(atk_state, def_state, measure, engine)
+
+def run_main(monkeypatch, tmp_path, lines, *options):
+
+    path = tmp_path / 'specs.txt'
+    path.write_text('\n'.join(lines) + '\n')
+    monkeypatch.setattr(sys, 'argv', ['batch.py', str(path)] + list(options))
+
+    return batch.main()
+
+def test_parse_side_sums_repeated_colours():
+
+    assert parse_side(['1', 'red', '2', 'Red', '1', 'blue'], batch.ATTACK_COLOURS) == {'Red': 3, 'Blue': 1}
+
+def test_parse_spec_sides():
+
+    assert parse_spec('2 red 1 blue vs 1 black 1 grey') == ({'Red': 2, 'Blue': 1}, {'Black': 1, 'Grey': 1})
+    assert parse_spec('1 yellow') == ({'Yellow': 1}, {})
+    assert parse_spec('vs 2 brown') == ({}, {'Brown': 2})
+
+@pytest.mark.parametrize('spec', ['2 red 1', 'two red', '1 purple', '1 black', 'vs 1 red', '1 red vs 1 black vs 1 grey', 'vs', '0 red vs 0 black'])
+def test_parse_spec_rejects_malformed_specs(spec):
+
+    with pytest.raises(ValueError):
+        parse_spec(spec)
+
+def test_output_keeps_input_order(monkeypatch, tmp_path, capsys):
+
+    # Pools of very different sizes finish out of order on several workers, but must be written in input order
+    lines = ['5 red 2 blue vs 3 black', '1 green', '# comment', 'vs 1 grey', '2 yellow 1 green', '1 purple'] * 5
+
+    assert run_main(monkeypatch, tmp_path, lines, '--format', 'json', '--workers', '3') == 1
+
+    captured = capsys.readouterr()
+    rows = [json.loads(line) for line in captured.out.splitlines()]
+    specs = [line for line in lines if line not in ('# comment', '1 purple')]
+
+    assert [row.pop('spec') for row in rows] == specs
+    assert rows == [compute(*parse_spec(spec), 'exact', 'exact') for spec in specs]
+    assert captured.err.count('Unknown die colour: purple') == 5
+
+def test_failure_is_raised_after_draining(monkeypatch, tmp_path, capsys):
+
+    # More specs than the bounded queue holds, so reading would block forever if the writer stopped draining it
+    monkeypatch.setattr(batch, 'compute', failing_compute)
+    lines = ['1 red', '1 green'] + ['2 red'] * 40
+
+    with pytest.raises(ValueError, match = 'bad spec'):
+        run_main(monkeypatch, tmp_path, lines, '--format', 'json', '--workers', '2')
+
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [row['spec'] for row in rows] == ['1 red']
@@ -0,0 +1,72 @@
+import json
+import random
+
+import pytest
+
+from dicepool import AttackPool, DefensePool, DicePool, count_divide, distribution_cache
+
+
+def fresh_roll(pool):
+
+    # roll() of a new pool with the same dice, computed from scratch
+    other = type(pool)(pool.engine)
+    other.state.update(pool.state)
+    distribution_cache.clear()
+
+    return {tuple(bundle[key] for key in pool.event_keys): bundle['Prob'] for bundle in other.roll()}
+
+def test_count_divide_undoes_count_combine():
+
+    pool = AttackPool()
+    rng = random.Random(3)
+
+    for trial in range(20):
+
+        counts = {(0, 0, 0): 1}
+        for die in range(rng.randint(1, 5)):
+            counts = pool.count_combine(counts, pool.die_counts(rng.choice(['Red', 'Yellow', 'Green']))[0])
+
+        die = pool.die_counts(rng.choice(['Red', 'Yellow', 'Green']))[0]
+        assert count_divide(pool.count_combine(counts, die), die) == counts
+
+@pytest.mark.parametrize('engine', ['exact', 'numpy'])
+@pytest.mark.parametrize('pool_class', [AttackPool, DefensePool])
+def test_add_remove_match_fresh_roll(pool_class, engine):
+
+    pool = pool_class(engine)
+    rng = random.Random(7)
+
+    for step in range(40):
+
+        present = [colour for colour in pool.colours if pool.state[colour]]
+
+        if present and (sum(pool.state.values()) >= 6 or rng.random() < 0.4):
+            pool.remove_die(rng.choice(present))
+        else:
+            pool.add_die(rng.choice(pool.colours))
+
+        # The pool's own roll first, while the entry seeded by add_die / remove_die is still cached
+        got = {tuple(bundle[key] for key in pool.event_keys): bundle['Prob'] for bundle in pool.roll()}
+        expected = fresh_roll(pool)
+
+        if engine == 'exact':
+            assert got == expected
+        else:
+            assert got.keys() == expected.keys()
+            assert all(abs(got[event] - expected[event]) < 1e-12 for event in got)
+
+def test_remove_die_that_only_misses(tmp_path):
+
+    path = str(tmp_path / 'dice.json')
+    with open(path, 'w') as file:
+        json.dump({'Custom': {'Symbols': ['Hit'], 'Dice': {'Plain': [{'Hit': 0}, {'Hit': 1}], 'Blank': [{'Miss': True}]}}}, file)
+
+    pool = DicePool('Custom', path = path)
+    pool.add_die('Plain')
+    pool.add_die('Blank')
+    distribution_cache.clear()
+
+    # All of Plain's hits are gone once Blank is in the pool, so removing Blank cannot divide it back out
+    pool.remove_die('Blank')
+
+    assert pool.counts() == ({(0,): 1, (1,): 1}, 2)
@@ -0,0 +1,46 @@
+import json
+
+import dicepool
+import lookup
+from dicepool import DicePool, distribution_cache
+from diskcache import DiskCache
+
+
+def test_paths_keep_compositions_apart(tmp_path):
+
+    cache = DiskCache(str(tmp_path))
+
+    first = ('Custom', 'counts', 'digest', ('D', 12))
+    second = ('Custom', 'counts', 'digest', ('D1', 2))
+
+    assert cache.path(first, '.json') != cache.path(second, '.json')
+
+def test_colliding_pools_load_their_own_counts(tmp_path, monkeypatch):
+
+    # 'D' x12 and 'D1' x2 once shared one cache file, so the second pool read the first pool's counts
+    path = str(tmp_path / 'dice.json')
+    with open(path, 'w') as file:
+        json.dump({'Custom': {'Symbols': ['Hit'], 'Dice': {'D': [{'Hit': 0}, {'Hit': 1}], 'D1': [{'Hit': 0}, {'Hit': 1}]}}}, file)
+
+    monkeypatch.setattr(dicepool, 'disk_cache', DiskCache(str(tmp_path / 'cache')))
+
+    many = DicePool('Custom', path = path)
+    many.state['D'] = 12
+    many.counts()
+
+    distribution_cache.clear()
+    few = DicePool('Custom', path = path)
+    few.state['D1'] = 2
+
+    counts, denominator = few.counts()
+    assert denominator == 4
+    assert counts == {(0,): 1, (1,): 2, (2,): 1}
+
+def test_lookup_tables_follow_the_disk_cache_switch(monkeypatch):
+
+    opened = []
+    monkeypatch.setattr(lookup.LookupTable, 'open', classmethod(lambda cls, *args: opened.append(args)))
+    monkeypatch.setattr(lookup, 'tables', {})
+
+    assert lookup.load_table('Attack', 'digest', 4) is None
+    assert opened == []
@@ -0,0 +1,80 @@
+from fractions import Fraction
+from itertools import combinations, product
+
+import pytest
+
+from dicepool import AttackPool, DefensePool
+from rerolls import combine_events, reroll_faces, reroll_roll
+
+
+def brute_force(pool, rerolls, kind, value):
+    """
+    Success probability when every ordered roll of the pool rerolls the best choice of up to 'rerolls' dice.
+    """
+
+    symbol = pool.event_keys.index(kind)
+    zero = (0,)*len(pool.event_keys)
+    dice = [colour for colour, num_dice in pool.composition() for die in range(num_dice)]
+    faces = {colour: [(tuple(face[key] for key in pool.event_keys), face['Prob']) for face in pool.dice[colour]] for colour in set(dice)}
+
+    def success(kept, colours):
+
+        chance = 0
+        for roll in product(*[faces[colour] for colour in colours]):
+
+            total, prob = kept, Fraction(1)
+            for event, face_prob in roll:
+                total, prob = combine_events(total, event), prob*face_prob
+
+            if total[0] != 'Miss' and total[symbol] >= value:
+                chance += prob
+
+        return chance
+
+    total = 0
+
+    for roll in product(*[faces[colour] for colour in dice]):
+
+        prob = Fraction(1)
+        for event, face_prob in roll:
+            prob *= face_prob
+
+        best = 0
+        for size in range(rerolls + 1):
+            for chosen in combinations(range(len(dice)), size):
+
+                kept = zero
+                for ind, (event, face_prob) in enumerate(roll):
+                    if ind not in chosen:
+                        kept = combine_events(kept, event)
+
+                best = max(best, success(kept, [dice[ind] for ind in chosen]))
+
+        total += prob*best
+
+    return total
+
+@pytest.mark.parametrize('pool_class, state, rerolls, kind, value', [
+    (AttackPool, {'Blue': 1, 'Red': 1}, 1, 'Heart', 4),
+    (AttackPool, {'Yellow': 2, 'Green': 1}, 2, 'Range', 3),
+    (AttackPool, {'Blue': 2}, 1, 'Heart', 3),
+    (DefensePool, {'Black': 1, 'Brown': 2}, 1, 'Shield', 3),
+])
+def test_reroll_roll_matches_ordered_enumeration(pool_class, state, rerolls, kind, value):
+
+    pool = pool_class()
+    pool.state.update(state)
+    bundles = reroll_roll(pool, rerolls, kind, value)
+
+    assert sum(bundle['Prob'] for bundle in bundles) == 1
+    assert sum(bundle['Prob'] for bundle in bundles if bundle[kind] != 'Miss' and bundle[kind] >= value) == brute_force(pool, rerolls, kind, value)
+
+def test_reroll_faces_rerolls_blue_misses_once():
+
+    pool = AttackPool()
+    pool.atk_state['Blue'] = 2
+    rerolled = reroll_faces(pool, 'Blue', lambda face: face['Heart'] == 'Miss')
+
+    assert sum(face['Prob'] for face in rerolled.dice['Blue']) == 1
+    assert rerolled.event_select('Miss')['Prob'] == 1 - Fraction(35, 36)**2
+    assert pool.event_select('Miss')['Prob'] == 1 - Fraction(5, 6)**2
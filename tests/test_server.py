@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from batch import compute
+from server import MAX_DICE, DiceService
+
+
+@pytest.fixture
+def service():
+
+    service = DiceService(workers = 1)
+    yield service
+    service.close()
+
+def respond(service, target, method = 'GET'):
+
+    return asyncio.run(service.respond(method, target))
+
+def test_distribution(service):
+
+    status, body = respond(service, '/distribution?pool=2+red+1+blue+vs+1+black&measure=great')
+
+    assert status == 200
+    assert body == compute({'Red': 2, 'Blue': 1}, {'Black': 1}, 'great', 'exact')
+
+def test_threshold_and_damage(service):
+
+    status, body = respond(service, '/threshold?pool=1+red+vs+1+grey&heart=2&shield=1&shield_measure=exact')
+    assert status == 200
+    assert body == {'Attack': pytest.approx(5/6), 'Defense': pytest.approx(1/2)}
+
+    status, body = respond(service, '/damage?pool=1+red+vs+1+grey')
+    assert status == 200
+    assert body['Damage'][0] == pytest.approx(1)
+
+@pytest.mark.parametrize('target', ['/distribution',
+                                    '/distribution?pool=1+purple',
+                                    '/distribution?pool=' + str(MAX_DICE + 1) + '+red',
+                                    '/distribution?pool=vs+' + str(MAX_DICE + 1) + '+black',
+                                    '/distribution?pool=1+red&measure=most',
+                                    '/threshold?pool=1+red&heart=two',
+                                    '/damage?pool=vs+1+black'
+                                    ])
+def test_bad_queries(service, target):
+
+    status, body = respond(service, target)
+
+    assert status == 400
+    assert 'error' in body
+
+def test_unknown_endpoint_and_method(service):
+
+    assert respond(service, '/odds?pool=1+red')[0] == 404
+    assert respond(service, '/distribution?pool=1+red', 'POST')[0] == 405
+
+def test_identical_queries_share_one_computation(service):
+
+    submitted = []
+    submit = service.executor.submit
+    service.executor.submit = lambda *args: submitted.append(args) or submit(*args)
+
+    async def run():
+        target = '/distribution?pool=3+red+2+yellow'
+        tasks = [asyncio.create_task(service.respond('GET', target)) for query in range(5)]
+
+        # Every task has reached the executor before any answer is back
+        await asyncio.sleep(0)
+        pending = len(service.pending)
+
+        return pending, await asyncio.gather(*tasks)
+
+    pending, answers = asyncio.run(run())
+
+    assert pending == 1
+    assert len(submitted) == 1
+    assert all(answer == answers[0] for answer in answers)
+    assert service.pending == {}
+
+    # A repeat is answered from the result cache
+    assert respond(service, '/distribution?pool=3+red+2+yellow') == answers[0]
+    assert len(submitted) == 1
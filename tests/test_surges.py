@@ -0,0 +1,70 @@
+from itertools import combinations
+
+import pytest
+
+from dicepool import AttackPool, DefensePool
+from surges import SurgeAbility, surge_curves, surge_damage
+
+ABILITIES = [SurgeAbility(1, heart = 1), SurgeAbility(1, range = 2), SurgeAbility(2, pierce = 2), SurgeAbility(1, heart = 1, pierce = 1)]
+
+
+def affordable_gains(surges):
+
+    # (heart, range, pierce) bought by every subset of the abilities that fits the surges
+    for size in range(len(ABILITIES) + 1):
+        for chosen in combinations(ABILITIES, size):
+            if sum(ability.cost for ability in chosen) <= surges:
+                yield tuple(sum(getattr(ability, kind) for ability in chosen) for kind in ('heart', 'range', 'pierce'))
+
+def make_pools():
+
+    atk_pool = AttackPool()
+    atk_pool.atk_state.update(Blue = 1, Yellow = 2, Green = 1)
+    def_pool = DefensePool()
+    def_pool.def_state.update(Grey = 1, Black = 1)
+
+    return atk_pool, def_pool
+
+@pytest.mark.parametrize('range_needed', [0, 4])
+def test_surge_damage_matches_subset_enumeration(range_needed):
+
+    atk_pool, def_pool = make_pools()
+    expected = {}
+
+    for bundle in atk_pool.roll():
+        for shield in def_pool.roll():
+
+            damage = 0
+
+            if bundle['Heart'] != 'Miss':
+                for heart, rng, pierce in affordable_gains(bundle['Surge']):
+                    if bundle['Range'] + rng >= range_needed:
+                        damage = max(damage, bundle['Heart'] + heart - max(0, shield['Shield'] - pierce))
+
+            expected[damage] = expected.get(damage, 0) + bundle['Prob']*shield['Prob']
+
+    got = surge_damage(atk_pool, def_pool, ABILITIES, range_needed)['Damage']['exact']
+
+    assert len(got) == max(expected) + 1
+    assert all(got[damage] == expected.get(damage, 0) for damage in range(len(got)))
+
+@pytest.mark.parametrize('range_needed', [0, 4])
+def test_surge_curves_match_subset_enumeration(range_needed):
+
+    atk_pool, def_pool = make_pools()
+    expected = {}
+
+    for bundle in atk_pool.roll():
+
+        if bundle['Heart'] == 'Miss':
+            key = 'Miss'
+        else:
+            best = max(affordable_gains(bundle['Surge']), key = lambda gain: (bundle['Range'] + gain[1] >= range_needed, gain[0], gain[2], gain[1]))
+            key = 'Miss' if bundle['Range'] + best[1] < range_needed else bundle['Heart'] + best[0]
+
+        expected[key] = expected.get(key, 0) + bundle['Prob']
+
+    curves = surge_curves(atk_pool, ABILITIES, 'Heart', range_needed)
+
+    assert curves['Miss'] == expected.get('Miss', 0)
+    assert all(prob == expected.get(heart, 0) for heart, prob in enumerate(curves['Heart']['exact']))
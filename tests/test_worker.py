@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from worker import ComputeWorker
+
+
+def wait_latest(worker, timeout = 5):
+
+    # Polls latest() the way MainPage.poll_worker does, until the newest request is finished
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        latest = worker.latest()
+        if latest is not None:
+            return latest
+        time.sleep(0.01)
+
+    raise AssertionError('worker gave no result')
+
+def test_superseded_requests_are_skipped():
+
+    worker = ComputeWorker()
+    started = threading.Event()
+    release = threading.Event()
+    computed = []
+
+    def compute(charts, atk_state, def_state):
+        computed.append(atk_state['Red'])
+        if len(computed) == 1:
+            started.set()
+            release.wait(5)
+        return {'Red': atk_state['Red']}
+
+    worker.compute = compute
+
+    # Hold the worker inside the first request while newer ones queue up behind it
+    worker.submit(['Attack'], {'Red': 1}, {}, 'first')
+    assert started.wait(5)
+
+    for num_dice in range(2, 6):
+        worker.submit(['Attack'], {'Red': num_dice}, {}, num_dice)
+    release.set()
+
+    try:
+        assert wait_latest(worker) == ({'Red': 5}, 5)
+        assert computed == [1, 5]
+    finally:
+        worker.stop()
+
+def test_errors_reach_latest():
+
+    worker = ComputeWorker()
+
+    def compute(charts, atk_state, def_state):
+        raise ValueError('bad pool')
+
+    worker.compute = compute
+    worker.submit(['Attack'], {'Red': 1}, {})
+
+    try:
+        with pytest.raises(ValueError, match = 'bad pool'):
+            wait_latest(worker)
+    finally:
+        worker.stop()
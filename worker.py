@@ -0,0 +1,141 @@
+"""
+Background computation for the GUI.
+
+The Tk event thread only paints: MainPage submits the dice counts it wants charted, a single worker thread brings its
+own AttackPool / DefensePool to those counts (one die at a time, see add_die / remove_die) and computes the chart
+data, and MainPage collects the result with after() polling. Every request carries a generation number; requests
+that a newer one has superseded are skipped before they start and their results are dropped, so rapid clicking
+only ever computes and paints the latest pool state.
+"""
+
+import queue
+import threading
+
+from dicepool import AttackPool, DefensePool, net_damage
+from instrument import log_event, spans
+
+
+def sync_pool(pool, state):
+
+    # Moves the pool to the given dice counts one die at a time, so every step reuses the previous distribution
+    for colour, num_dice in state.items():
+
+        while pool.state[colour] < num_dice:
+            pool.add_die(colour)
+        while pool.state[colour] > num_dice:
+            pool.remove_die(colour)
+
+class ComputeWorker:
+
+    def __init__(self, engine = 'exact'):
+        """
+        - atk_pool / def_pool: Pools owned by the worker thread (other threads may only use stateless helpers).
+        - generation: Number of the newest request; results of older requests are dropped.
+        """
+
+        self.atk_pool = AttackPool(engine)
+        self.def_pool = DefensePool(engine)
+
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.generation = 0
+        self.lock = threading.Lock()
+
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
+
+    def submit(self, charts, atk_state, def_state, context = None):
+        """
+        Queues the data for the given charts ('Attack', 'Defense', 'Damage') at the given dice counts.
+        context is handed back untouched with the result (e.g. the inputs the charts were requested for).
+        Returns the request's generation number.
+        """
+
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+
+        self.requests.put((generation, frozenset(charts), dict(atk_state), dict(def_state), context))
+
+        return generation
+
+    def current(self, generation):
+
+        with self.lock:
+            return generation == self.generation
+
+    def run(self):
+
+        while True:
+
+            request = self.requests.get()
+
+            # Only the newest queued request is worth computing
+            while request is not None:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+
+            if request is None:
+                return
+
+            generation, charts, atk_state, def_state, context = request
+
+            if not self.current(generation):
+                log_event('request superseded', generation = generation)
+                continue
+
+            try:
+                result = self.compute(charts, atk_state, def_state)
+            except Exception as error:
+                result = error
+
+            self.results.put((generation, result, context))
+
+    def compute(self, charts, atk_state, def_state):
+
+        with spans.span('compute', charts = sorted(charts)):
+
+            sync_pool(self.atk_pool, atk_state)
+            sync_pool(self.def_pool, def_state)
+
+            data = {}
+
+            if 'Attack' in charts:
+                data['Attack'] = {'Curves': self.atk_pool.curves(), 'Heart': self.atk_pool.max_heart(), 'Range': self.atk_pool.max_range(), 'Blue': atk_state['Blue'] != 0}
+
+            if 'Defense' in charts:
+                data['Defense'] = {'Curves': self.def_pool.curves(), 'Shield': self.def_pool.max_shield()}
+
+            if 'Damage' in charts:
+                data['Damage'] = net_damage(self.atk_pool, self.def_pool)
+
+        return data
+
+    def latest(self):
+        """
+        Returns (result, context) of the newest request once it is finished, or None while it is still being computed.
+        Errors raised by the computation are re-raised here, on the caller's thread.
+        """
+
+        latest = None
+
+        while True:
+
+            try:
+                generation, result, context = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if self.current(generation):
+                latest = (result, context)
+
+        if latest is not None and isinstance(latest[0], Exception):
+            raise latest[0]
+
+        return latest
+
+    def stop(self):
+
+        self.requests.put(None)